@@ -0,0 +1,239 @@
+"""
+Read-only JSON API for scoreboards, overlays and bots, next to the Streamlit app.
+
+    python api_server.py --port 8502
+
+    GET /tournaments                      active tournaments with their state versions
+    GET /tournaments/<id>/bracket         every populated match
+    GET /tournaments/<id>/ready           matches waiting to be played
+    GET /tournaments/<id>/results         decided matches
+    GET /tournaments/<id>/wait?version=N  blocks (up to ?timeout=, max 60 s) until
+                                          the state version differs from N
+
+Bodies are compact JSON built once per state version and shared by every
+client. ETags come from the state version, so a conditional GET with an
+unchanged bracket is a 304 without touching the bracket at all. Long polls
+share one watcher thread that checks the versions only while someone waits.
+"""
+import argparse
+import gzip
+import json
+import re
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import database as db
+import game_logic as gl
+
+POLL_INTERVAL = 0.5
+MAX_WAIT_SECONDS = 60
+GZIP_MIN_BYTES = 1024
+MATCH_COLUMNS = ["id", "p1", "p2", "winner", "loser", "next_w", "next_l"]
+
+_ROUTE = re.compile(r"^/tournaments/(\d+)/(bracket|ready|results|wait)/?$")
+
+# --- RESPONSE BODIES ---
+_CACHE_SIZE = 64
+_bodies = {}
+_bodies_lock = threading.Lock()
+
+def _bracket_order(m):
+    prefix, round_no, idx = gl.parse_match_id(m['id'])
+    return ("WLF".index(prefix), round_no, idx)
+
+def _match_row(m):
+    return [m['id'], m['p1'], m['p2'], m['winner'], m['loser'], m.get('next_w'), m.get('next_l')]
+
+def _build_body(tournament_id, version, endpoint):
+    bracket = db.load_bracket_state(tournament_id, readonly=True, version=version)
+    if not bracket:
+        return None
+    matches = gl.get_graph(bracket).matches.values()
+    if endpoint == "ready":
+        matches = [m for m in matches if m['p1'] and m['p2'] and not m['winner']
+                   and "BYE" not in (m['p1'], m['p2'])]
+    elif endpoint == "results":
+        matches = [m for m in matches if m['winner']]
+    data = {
+        "tournament_id": tournament_id,
+        "version": version,
+        "total_players": bracket['meta']['total_players'],
+        "columns": MATCH_COLUMNS,
+        "matches": [_match_row(m) for m in sorted(matches, key=_bracket_order)],
+    }
+    return json.dumps(data, separators=(",", ":")).encode()
+
+def get_body(tournament_id, version, endpoint):
+    """(raw, gzipped) json for this state version, built by the first client that asks"""
+    key = (tournament_id, version, endpoint)
+    with _bodies_lock:
+        cached = _bodies.get(key)
+    if cached:
+        return cached
+
+    raw = _build_body(tournament_id, version, endpoint)
+    if raw is None:
+        return None
+    cached = (raw, gzip.compress(raw, 6) if len(raw) >= GZIP_MIN_BYTES else None)
+    with _bodies_lock:
+        if len(_bodies) >= _CACHE_SIZE:
+            del _bodies[next(iter(_bodies))]
+        _bodies[key] = cached
+    return cached
+
+# --- LONG POLL ---
+class VersionWatcher:
+    """One thread polls every tournament's version while at least one client waits"""
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self.versions = {}
+        self.polls = 0
+        self.waiters = 0
+        self.changed = threading.Condition()
+        self.thread = None
+
+    def wait_for_change(self, tournament_id, known_version, timeout):
+        """Returns the current version once it differs from known_version, or after timeout"""
+        with self.changed:
+            self.waiters += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="version-watcher", daemon=True)
+                self.thread.start()
+            self.changed.notify_all()
+            # Versions polled before we arrived may be stale; only trust newer polls
+            start = self.polls
+            try:
+                self.changed.wait_for(lambda: self.polls > start and
+                                      self.versions.get(tournament_id, known_version) != known_version, timeout)
+                return self.versions.get(tournament_id, known_version) if self.polls > start else known_version
+            finally:
+                self.waiters -= 1
+
+    def _run(self):
+        try:
+            while True:
+                with self.changed:
+                    # Idle: sleep until a client starts waiting
+                    self.changed.wait_for(lambda: self.waiters > 0)
+                try:
+                    # Every status: archiving bumps the version too, and must wake its waiters
+                    versions = db.get_state_versions(status=None)
+                except sqlite3.Error:
+                    versions = None  # e.g. locked for longer than the busy timeout; try again next round
+                with self.changed:
+                    if versions is not None:
+                        self.versions = versions
+                        self.polls += 1
+                        self.changed.notify_all()
+                    # Doubles as the poll delay; a new waiter just wakes us early
+                    self.changed.wait(self.interval)
+        finally:
+            # Anything else ends the thread; let the next waiter start a new one
+            with self.changed:
+                self.thread = None
+
+_watcher = VersionWatcher()
+
+# --- HTTP ---
+class BracketAPIHandler(BaseHTTPRequestHandler):
+    server_version = "BracketAPI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path.rstrip("/") == "/tournaments":
+            return self._tournaments()
+
+        match = _ROUTE.match(url.path)
+        if not match:
+            return self._send_json(404, {"error": "not found"})
+        tournament_id, endpoint = int(match.group(1)), match.group(2)
+
+        if endpoint == "wait":
+            return self._wait(tournament_id, query)
+
+        version = db.get_state_version(tournament_id)
+        etag = f'W/"t{tournament_id}-v{version}-{endpoint}"'
+        if etag in self.headers.get("If-None-Match", ""):
+            return self._send(304, b"", etag=etag)
+
+        body = get_body(tournament_id, version, endpoint) if version else None
+        if body is None:
+            return self._send_json(404, {"error": "no such active tournament"})
+        self._send(200, *self._encoded(body), etag=etag)
+
+    def _tournaments(self):
+        versions = db.get_state_versions()
+        names = dict(db.list_tournaments())
+        etag = 'W/"' + "-".join(f"{tid}.{v}" for tid, v in sorted(versions.items())) + '"'
+        if etag in self.headers.get("If-None-Match", ""):
+            return self._send(304, b"", etag=etag)
+        data = [{"id": tid, "name": names.get(tid), "version": v} for tid, v in sorted(versions.items())]
+        self._send(200, json.dumps(data, separators=(",", ":")).encode(), etag=etag)
+
+    def _wait(self, tournament_id, query):
+        try:
+            known = int(query.get("version", ["0"])[0])
+            timeout = min(float(query.get("timeout", ["30"])[0]), MAX_WAIT_SECONDS)
+        except ValueError:
+            return self._send_json(400, {"error": "version and timeout must be numbers"})
+        version = db.get_state_version(tournament_id)
+        if version == known:
+            version = _watcher.wait_for_change(tournament_id, known, timeout)
+        self._send_json(200, {"tournament_id": tournament_id, "version": version, "changed": version != known})
+
+    def _encoded(self, body):
+        raw, gzipped = body
+        if gzipped and "gzip" in self.headers.get("Accept-Encoding", ""):
+            return gzipped, "gzip"
+        return raw, None
+
+    def _send_json(self, status, data):
+        self._send(status, json.dumps(data, separators=(",", ":")).encode())
+
+    def _send(self, status, payload, encoding=None, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "no-cache")
+        if etag:
+            self.send_header("ETag", etag)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+            self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # dozens of pollers would flood the console
+
+def make_server(host="127.0.0.1", port=8502):
+    db.init_db()
+    server = ThreadingHTTPServer((host, port), BracketAPIHandler)
+    server.daemon_threads = True
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve bracket state as JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port)
+    print(f"Bracket API on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        db.close_connections()
+
+if __name__ == "__main__":
+    main()
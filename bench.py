@@ -0,0 +1,230 @@
+"""
+Headless benchmark for the bracket engine, storage and spectator html.
+
+    python bench.py                       # 4 .. 4096 players, results in bench_results.json
+    python bench.py --sizes 8 64 --repeat 5 --out quick.json
+
+Every field plays one random full tournament against a throwaway database.
+Timings are taken first; peak memory (tracemalloc) comes from a second,
+separate pass so the tracing overhead does not skew the clock.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import bracket_codec
+import bracket_html as bh
+import database as db
+import game_logic as gl
+import scheduler
+
+DEFAULT_SIZES = [4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096]
+# Table-scheduling what-if: simulated event minutes, FIFO vs call board order
+SCHEDULE_MAX_PLAYERS = 512
+SCHEDULE_RUNS = 20
+
+# --- TOURNAMENT PLAY ---
+def play_order(bracket):
+    """Every match id, feeders first (a single pass over this list finishes the bracket)"""
+    total = gl.get_graph(bracket).total_players
+    order, seen = [], set()
+    # Iterative DFS from the grand final; big fields would blow the recursion limit
+    stack = [("F1-1", False)]
+    while stack:
+        match_id, expanded = stack.pop()
+        if expanded:
+            order.append(match_id)
+            continue
+        if match_id in seen: continue
+        seen.add(match_id)
+        stack.append((match_id, True))
+        for feeder_id in reversed(gl.feeder_match_ids(match_id, total)):
+            if feeder_id not in seen:
+                stack.append((feeder_id, False))
+    return order
+
+def play_tournament(bracket, rng):
+    """Plays every open match with a random winner (a real player always beats a BYE). Returns the ids played."""
+    graph = gl.get_graph(bracket)
+    played = []
+    for match_id in play_order(bracket):
+        m = graph.get(match_id)
+        if not m or m['winner'] or not m['p1'] or not m['p2']:
+            continue
+        real = [p for p in (m['p1'], m['p2']) if p != "BYE"]
+        gl.record_result(bracket, match_id, rng.choice(real) if real else "BYE")
+        played.append(match_id)
+    return played
+
+# --- MEASUREMENT ---
+class Recorder:
+    """Collects seconds (and with tracemalloc on, peak bytes) per named operation"""
+
+    def __init__(self):
+        self.ops = {}
+
+    def measure(self, name, fn, *args, calls=1):
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+
+        op = self.ops.setdefault(name, {"seconds": 0.0, "calls": 0})
+        op["seconds"] += elapsed
+        op["calls"] += calls
+        if tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1] - base
+            op["peak_bytes"] = max(op.get("peak_bytes", 0), peak)
+        return result
+
+def _record_all(bracket, rng, played):
+    played.extend(play_tournament(bracket, rng))
+
+def _undo_all(bracket, played):
+    for match_id in reversed(played):
+        gl.undo_match(bracket, match_id)
+
+def run_field(n_players, seed):
+    """One full tournament for n_players. Returns {op: {"seconds", "calls"[, "peak_bytes"]}}"""
+    rng = random.Random(seed)
+    random.seed(seed)  # generate_bracket shuffles with the module rng
+    names = [f"Player {i:04d}" for i in range(n_players)]
+    rec = Recorder()
+
+    bracket = rec.measure("generate_bracket", gl.generate_bracket, names)
+    tournament_id = rec.measure("save_initial", db.create_tournament, f"Bench {n_players}", bracket)
+
+    played = []
+    rec.measure("record_result", _record_all, bracket, rng, played)
+    rec.ops["record_result"]["calls"] = len(played)
+
+    rec.measure("advance_bracket", gl.advance_bracket, bracket)
+    rec.measure("save_full", db.save_bracket_state, bracket, tournament_id)
+
+    # One result changed, as after a manager click
+    final_id = played[-1]
+    winner = gl.get_graph(bracket).get(final_id)['winner']
+    gl.undo_match(bracket, final_id)
+    gl.record_result(bracket, final_id, winner)
+    rec.measure("save_incremental", db.save_bracket_state, bracket, tournament_id)
+
+    # The same click through the undo log: journaled save, undo, redo
+    gl.undo_match(bracket, final_id)
+    gl.start_journal(bracket)
+    gl.record_result(bracket, final_id, winner)
+    action = ("result", final_id, gl.take_journal(bracket))
+    rec.measure("save_action", db.save_bracket_state, bracket, tournament_id, action)
+    bracket, _ = rec.measure("undo_action", db.undo_actions, tournament_id, bracket)
+    rec.measure("redo_action", db.redo_actions, tournament_id, bracket)
+
+    db._bracket_cache.pop(tournament_id, None)
+    rec.measure("load_cold", db.load_bracket_state, tournament_id)
+    rec.measure("load_cached", db.load_bracket_state, tournament_id)
+    rec.measure("load_readonly", db.load_bracket_state, tournament_id, None, True)
+
+    rec.measure("render_html", bh.render_bracket_html, bracket)
+
+    # Whole-bracket blobs (undo snapshots): JSON against bracket_codec
+    blobs = {
+        "json": rec.measure("encode_json", json.dumps, bracket),
+        "codec": rec.measure("encode_codec", bracket_codec.encode, bracket),
+        "codec_zlib": rec.measure("encode_codec_zlib", bracket_codec.encode, bracket, True),
+    }
+    for kind, blob in blobs.items():
+        rec.measure(f"decode_{kind}", json.loads if kind == "json" else bracket_codec.decode, blob)
+        rec.ops[f"encode_{kind}"]["bytes"] = len(blob)
+
+    rec.measure("undo_match", _undo_all, bracket, played, calls=len(played))
+    return rec.ops
+
+def schedule_minutes(n_players, tables, seed):
+    """Mean simulated event length per calling policy"""
+    return {
+        policy: sum(scheduler.simulate_event(n_players, tables, policy, seed=seed + i)
+                    for i in range(SCHEDULE_RUNS)) / SCHEDULE_RUNS
+        for policy in ("fifo", "critical")
+    }
+
+def run(sizes, repeat, seed, memory=True, tables=8):
+    """Runs every size `repeat` times (best time kept) against a temp database"""
+    workdir = tempfile.mkdtemp(prefix="bracket-bench-")
+    original_db = db.DB_FILE
+    db.DB_FILE = os.path.join(workdir, "bench.db")
+    results = []
+    try:
+        db.init_db()
+        for n_players in sizes:
+            best = None
+            for r in range(repeat):
+                ops = run_field(n_players, seed + r)
+                if best is None:
+                    best = ops
+                else:
+                    for name, op in ops.items():
+                        if op["seconds"] < best[name]["seconds"]:
+                            best[name] = op
+
+            if memory:
+                tracemalloc.start()
+                try:
+                    traced = run_field(n_players, seed)
+                finally:
+                    tracemalloc.stop()
+                for name, op in traced.items():
+                    best[name]["peak_bytes"] = op["peak_bytes"]
+
+            entry = {"players": n_players, "ops": best}
+            if tables and n_players <= SCHEDULE_MAX_PLAYERS:
+                entry["schedule"] = {"tables": tables, "minutes": schedule_minutes(n_players, tables, seed)}
+            results.append(entry)
+            _print_row(n_players, best, entry.get("schedule"))
+    finally:
+        db.close_connections()
+        db.DB_FILE = original_db
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def _print_row(n_players, ops, schedule=None):
+    cells = " ".join(f"{name}={op['seconds'] * 1000:.1f}ms" for name, op in ops.items())
+    print(f"{n_players:>5} players: {cells}", flush=True)
+    if schedule:
+        minutes = schedule["minutes"]
+        print(f"       {schedule['tables']} tables: fifo={minutes['fifo']:.0f}min critical={minutes['critical']:.0f}min",
+              flush=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the bracket engine headless.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="field sizes to run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per size, the fastest is kept")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--tables", type=int, default=8, help="tables for the scheduling what-if (0 skips it)")
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.seed, memory=not args.no_memory, tables=args.tables)
+    report = {
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "sqlite": db.sqlite3.sqlite_version,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
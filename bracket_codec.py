@@ -0,0 +1,141 @@
+"""
+Compact binary encoding for whole brackets (undo snapshots).
+
+    blob = bracket_codec.encode(bracket, compress=True)
+    bracket = bracket_codec.decode(blob)      # also reads the old JSON text
+
+Layout, after a 5 byte header (b"BKT", format version, flags):
+
+    meta          u32 length + JSON
+    name table    u16 count, then u16 length + utf-8 per name
+    per section   u16 rounds; per round u16 matches, then one fixed-width
+                  record per match in list order
+
+A record is the match number within its round, p1/p2/winner/loser as
+indexes into the name table (0 = empty) and next_w/next_l as
+(prefix, round, number). The section and round come from the record's
+position, so match ids and dict keys are not stored at all. With
+FLAG_ZLIB everything after the header is deflated.
+"""
+import json
+import struct
+import zlib
+
+MAGIC = b"BKT"
+VERSION = 1
+FLAG_ZLIB = 1
+
+SECTIONS = (("W", "winners"), ("L", "losers"), ("F", "finals"))
+
+_HEADER = struct.Struct("<3sBB")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_FIELDS = "H4HBBHBBH"
+_RECORD = struct.Struct("<" + _FIELDS)
+_NO_LINK = (0, 0, 0)
+
+def _link(match_id, cache):
+    """next_w/next_l id -> (ord(prefix), round, number); shared targets are parsed once"""
+    link = cache.get(match_id)
+    if link is None:
+        if match_id:
+            r, i = match_id[1:].split("-")
+            link = (ord(match_id[0]), int(r), int(i))
+        else:
+            link = _NO_LINK
+        cache[match_id] = link
+    return link
+
+def _unlink(link, cache):
+    match_id = cache.get(link, False)
+    if match_id is False:
+        match_id = cache[link] = f"{chr(link[0])}{link[1]}-{link[2]}" if link[0] else None
+    return match_id
+
+def encode(bracket, compress=False):
+    """bytes for a bracket dict; raises ValueError for a match filed under the wrong round"""
+    names, name_index = [], {None: 0}
+    def intern(name):
+        index = name_index.get(name)
+        if index is None:
+            names.append(name)
+            index = name_index[name] = len(names)
+        return index
+
+    body, links = [], {}
+    for prefix, section in SECTIONS:
+        rounds = bracket.get(section, [])
+        body.append(_U16.pack(len(rounds)))
+        for round_no, matches in enumerate(rounds, start=1):
+            # One pack per round: the records are fixed width and back to back
+            head = f"{prefix}{round_no}-"
+            values = []
+            for m in matches:
+                if not m['id'].startswith(head):
+                    raise ValueError(f"{m['id']} is filed under {section} round {round_no}")
+                values += (int(m['id'][len(head):]), intern(m['p1']), intern(m['p2']),
+                           intern(m['winner']), intern(m['loser']))
+                values += _link(m.get('next_w'), links)
+                values += _link(m.get('next_l'), links)
+            body.append(_U16.pack(len(matches)) + struct.pack("<" + _FIELDS * len(matches), *values))
+    if len(names) >= 0xFFFF:
+        raise ValueError("too many distinct names for one bracket")
+
+    meta = json.dumps(bracket.get('meta', {}), separators=(",", ":")).encode()
+    table = [_U16.pack(len(names))]
+    for name in names:
+        raw = name.encode()
+        table.append(_U16.pack(len(raw)) + raw)
+    payload = b"".join([_U32.pack(len(meta)), meta] + table + body)
+
+    flags = 0
+    if compress:
+        payload, flags = zlib.compress(payload, 6), FLAG_ZLIB
+    return _HEADER.pack(MAGIC, VERSION, flags) + payload
+
+def decode(data):
+    """Bracket dict from encode() output, or from the JSON text stored before the codec existed"""
+    if isinstance(data, str):
+        return json.loads(data)
+    if not data.startswith(MAGIC):
+        return json.loads(data)
+
+    _, version, flags = _HEADER.unpack_from(data)
+    if version > VERSION:
+        raise ValueError(f"bracket encoded with format {version}, this build reads up to {VERSION}")
+    payload = data[_HEADER.size:]
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+
+    (size,), pos = _U32.unpack_from(payload), _U32.size
+    bracket = {}
+    meta = json.loads(payload[pos:pos + size])
+    pos += size
+
+    (count,), pos = _U16.unpack_from(payload, pos), pos + _U16.size
+    names = [None]
+    for _ in range(count):
+        (size,), pos = _U16.unpack_from(payload, pos), pos + _U16.size
+        names.append(payload[pos:pos + size].decode())
+        pos += size
+
+    links = {}
+    for prefix, section in SECTIONS:
+        (round_total,), pos = _U16.unpack_from(payload, pos), pos + _U16.size
+        rounds = bracket[section] = []
+        for round_no in range(1, round_total + 1):
+            (count,), pos = _U16.unpack_from(payload, pos), pos + _U16.size
+            end = pos + count * _RECORD.size
+            head = f"{prefix}{round_no}-"
+            matches = []
+            for idx, p1, p2, winner, loser, wp, wr, wi, lp, lr, li in _RECORD.iter_unpack(payload[pos:end]):
+                m = {"id": head + str(idx),
+                     "p1": names[p1], "p2": names[p2], "winner": names[winner], "loser": names[loser],
+                     "next_w": _unlink((wp, wr, wi), links)}
+                if prefix == "W":
+                    m['next_l'] = _unlink((lp, lr, li), links)
+                matches.append(m)
+            rounds.append(matches)
+            pos = end
+    bracket['meta'] = meta
+    return bracket
@@ -0,0 +1,114 @@
+import html
+import threading
+import game_logic as gl
+
+# Spectator bracket as ONE html document (cards + svg connector lines).
+# No Streamlit in here so it can be built and timed headless.
+
+# (column width, card width, card height, vertical gap between first-round cards)
+DEFAULT_LAYOUT = (340, 260, 61, 24)
+HEADER_HEIGHT = 28
+
+_CACHE_SIZE = 32
+_html_cache = {}
+_html_lock = threading.Lock()
+
+SECTION_TITLES = [
+    ("W", "winners", "🔥 Winners Bracket"),
+    ("L", "losers", "🛡️ Losers Bracket"),
+    ("F", "finals", "👑 Grand Finals"),
+]
+
+def match_card_html(match, style="", connector=True, h2h=None):
+    """One match card. Names are escaped; empty slots read 'Waiting...'. h2h = (p1 wins, p2 wins)"""
+    winner = match['winner']
+    rows = []
+    for slot in ('p1', 'p2'):
+        name = match.get(slot) or "Waiting..."
+        won = bool(winner) and winner == name
+        rows.append(
+            f'<div class="player-row">'
+            f'<span class="player-name {"winner-text" if won else ""}">{html.escape(name)}</span>'
+            f'<span class="score-box {"winner-box" if won else ""}">{"✓" if won else ""}</span>'
+            f'</div>'
+        )
+    connector_html = '<div class="connector-r"></div>' if connector else ''
+    h2h_html = f'<div class="h2h">H2H {h2h[0]}–{h2h[1]}</div>' if h2h and any(h2h) else ''
+    return f'<div class="match-card"{style}>{h2h_html}{rows[0]}<div class="divider"></div>{rows[1]}{connector_html}</div>'
+
+def is_cached(cache_key, layout=DEFAULT_LAYOUT):
+    """True if render_bracket_html would answer this key from its cache"""
+    return (cache_key, layout) in _html_cache
+
+def render_bracket_html(bracket, cache_key=None, layout=DEFAULT_LAYOUT, h2h=None):
+    """
+    The whole spectator bracket as a single html string. With a cache_key
+    (e.g. (tournament_id, state_version)) repeat calls are a dict lookup, so
+    the key must also cover anything else that changes the output (h2h).
+    h2h maps (p1, p2) -> (p1 wins, p2 wins).
+    """
+    key = (cache_key, layout)
+    doc = _html_cache.get(key) if cache_key is not None else None
+    if doc is not None:
+        return doc
+
+    parts = ['<div class="bracket-doc" style="overflow-x: auto;">']
+    for prefix, section, title in SECTION_TITLES:
+        if not bracket.get(section):
+            continue
+        if prefix != "W":
+            parts.append('<hr>')
+        parts.append(f'<h3>{title}</h3>')
+        parts.append(_section_html(bracket, prefix, len(bracket[section]), layout, h2h or {}))
+    parts.append('</div>')
+    doc = "".join(parts)
+
+    if cache_key is not None:
+        with _html_lock:
+            if len(_html_cache) >= _CACHE_SIZE:
+                _html_cache.pop(next(iter(_html_cache)), None)
+            _html_cache[key] = doc
+    return doc
+
+def _section_html(bracket, prefix, round_total, layout, h2h):
+    col_width, card_width, card_height, gap = layout
+    pitch = card_height + gap
+
+    # Cards sit level with their same-section feeders (midpoint of two),
+    # otherwise they stack top to bottom.
+    graph = gl.get_graph(bracket)
+    tops = {}
+    columns = []
+    for r_idx in range(round_total):
+        matches = gl.round_matches(bracket, prefix, r_idx + 1)
+        for i, m in enumerate(matches):
+            feeders = [tops[f] for f in graph.feeders_of(m['id']) if f in tops]
+            tops[m['id']] = sum(feeders) / len(feeders) if feeders else i * pitch
+        columns.append(matches)
+
+    height = max(tops.values()) + card_height + HEADER_HEIGHT
+    width = round_total * col_width
+
+    cards, lines = [], []
+    for r_idx, matches in enumerate(columns):
+        x = r_idx * col_width
+        cards.append(f'<div class="caption" style="position: absolute; left: {x}px; top: 0; '
+                     f'width: {card_width}px; text-align: center; color: #888; font-size: 13px;">Round {r_idx + 1}</div>')
+        for m in matches:
+            y = tops[m['id']] + HEADER_HEIGHT
+            style = f' style="position: absolute; left: {x}px; top: {y}px; width: {card_width}px;"'
+            cards.append(match_card_html(m, style, connector=False, h2h=h2h.get((m['p1'], m['p2']))))
+
+            target = m.get('next_w')
+            if target in tops:
+                # Elbow from the right edge of this card to the left edge of its target
+                x1, y1 = x + card_width, y + card_height / 2
+                x2 = x + col_width
+                y2 = tops[target] + HEADER_HEIGHT + card_height / 2
+                mid = (x1 + x2) / 2
+                lines.append(f'M{x1} {y1}H{mid}V{y2}H{x2}')
+
+    svg = (f'<svg width="{width}" height="{height}" style="position: absolute; left: 0; top: 0;">'
+           f'<path d="{" ".join(lines)}" stroke="#555" stroke-width="2" fill="none"/></svg>')
+    return (f'<div style="position: relative; width: {width}px; height: {height}px; margin-bottom: 1rem;">'
+            f'{svg}{"".join(cards)}</div>')
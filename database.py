@@ -1,15 +1,147 @@
 import sqlite3
 import json
 import uuid
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+import perf
+import game_logic as gl
+import bracket_codec
 
 DB_FILE = 'air_hockey.db'
 
+# --- CONNECTION MANAGER ---
+# A small process-wide pool of warm connections shared by every Streamlit
+# script thread. Connections are opened in autocommit mode; writes go through
+# transaction() so each one is an explicit BEGIN IMMEDIATE/COMMIT.
+POOL_SIZE = 4
+BUSY_TIMEOUT_MS = 5000
+MMAP_SIZE = 64 * 1024 * 1024
+STATEMENT_CACHE_SIZE = 256
+
+_pool = []
+_pool_file = None
+_pool_lock = threading.Lock()
+
+def _open_connection():
+    conn = sqlite3.connect(DB_FILE, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                           check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    conn.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+@contextmanager
+def get_connection():
+    """Borrows a pooled connection for the duration of the block"""
+    global _pool_file
+    perf.count("db_calls")
+    with _pool_lock:
+        if _pool_file != DB_FILE:
+            # DB_FILE was pointed somewhere else (tests, benchmarks)
+            for stale in _pool: stale.close()
+            _pool.clear()
+            _pool_file = DB_FILE
+        conn = _pool.pop() if _pool else None
+        conn_file = _pool_file
+
+    if conn is None:
+        conn = _open_connection()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        with _pool_lock:
+            if conn_file == _pool_file and len(_pool) < POOL_SIZE:
+                _pool.append(conn)
+            else:
+                conn.close()
+
+@contextmanager
+def transaction():
+    """
+    Runs the block inside BEGIN IMMEDIATE/COMMIT on a pooled connection,
+    rolling back on error. Taking the write lock up front means a
+    read-then-write block waits (busy_timeout) for other writers instead of
+    failing with "database is locked" when it gets to its first write.
+    """
+    with get_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.execute('COMMIT')
+
+def close_connections():
+    """Closes every idle pooled connection"""
+    with _pool_lock:
+        for conn in _pool: conn.close()
+        _pool.clear()
+
+SECTIONS = ('winners', 'losers', 'finals')
+
+# --- SCHEMA ---
+# Migrations run in order from the version recorded in schema_version, once
+# per process (reruns of main.py only pay a flag check). Version 1 is the
+# idempotent baseline, so it also upgrades files from before schema_version.
+_init_lock = threading.Lock()
+_initialized_file = None
+
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
+    """Creates or upgrades the schema; a no-op after the first call per process"""
+    global _initialized_file
+    if _initialized_file == DB_FILE: return
+    with _init_lock:
+        if _initialized_file == DB_FILE: return
+        with transaction() as c:
+            c.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+            row = c.execute('SELECT version FROM schema_version').fetchone()
+            current = row[0] if row else 0
+            for migrate in MIGRATIONS[current:]:
+                migrate(c)
+            if current != len(MIGRATIONS):
+                c.execute('DELETE FROM schema_version')
+                c.execute('INSERT INTO schema_version (version) VALUES (?)', (len(MIGRATIONS),))
+        _initialized_file = DB_FILE
+
+def _schema_v1(c):
+    """Baseline: every table and index that existed before schema_version"""
     c.execute('CREATE TABLE IF NOT EXISTS players (name TEXT PRIMARY KEY, participation INTEGER DEFAULT 0)')
-    c.execute('CREATE TABLE IF NOT EXISTS tournament_state (id INTEGER PRIMARY KEY, data TEXT)')
+    # One row per tournament; the bracket itself lives in matches
+    c.execute('''CREATE TABLE IF NOT EXISTS tournaments (
+                    id INTEGER PRIMARY KEY,
+                    meta TEXT,
+                    w_rounds INTEGER,
+                    l_rounds INTEGER,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    name TEXT,
+                    status TEXT NOT NULL DEFAULT 'active',
+                    created_at DATETIME)''')
+    _add_column_if_missing(c, 'tournaments', 'version', 'INTEGER NOT NULL DEFAULT 0')
+    _add_column_if_missing(c, 'tournaments', 'name', 'TEXT')
+    _add_column_if_missing(c, 'tournaments', 'status', "TEXT NOT NULL DEFAULT 'active'")
+    c.execute('CREATE INDEX IF NOT EXISTS idx_tournaments_status ON tournaments (status, id)')
+    c.execute('''CREATE TABLE IF NOT EXISTS matches (
+                    tournament_id INTEGER NOT NULL,
+                    match_id TEXT NOT NULL,
+                    section TEXT NOT NULL,
+                    round INTEGER NOT NULL,
+                    idx INTEGER NOT NULL,
+                    p1 TEXT,
+                    p2 TEXT,
+                    winner TEXT,
+                    loser TEXT,
+                    next_w TEXT,
+                    next_l TEXT,
+                    PRIMARY KEY (tournament_id, match_id)) WITHOUT ROWID''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_matches_section ON matches (tournament_id, section, round, idx)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_matches_p1 ON matches (p1)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_matches_p2 ON matches (p2)')
     # NEW: Table for archival data
     c.execute('''CREATE TABLE IF NOT EXISTS match_history (
                     id TEXT PRIMARY KEY, 
@@ -19,116 +151,779 @@ def init_db():
                     p2 TEXT, 
                     winner TEXT, 
                     timestamp DATETIME)''')
-    conn.commit()
-    conn.close()
+    c.execute('CREATE INDEX IF NOT EXISTS idx_history_p1 ON match_history (p1)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_history_p2 ON match_history (p2)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_history_winner ON match_history (winner)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_history_tournament ON match_history (tournament_id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_history_timestamp ON match_history (timestamp)')
+    # Per-player aggregates, maintained by archive_tournament
+    backfill_stats = not _table_exists(c, 'player_stats')
+    c.execute('''CREATE TABLE IF NOT EXISTS player_stats (
+                    name TEXT PRIMARY KEY,
+                    wins INTEGER NOT NULL DEFAULT 0,
+                    losses INTEGER NOT NULL DEFAULT 0,
+                    titles INTEGER NOT NULL DEFAULT 0,
+                    tournaments_played INTEGER NOT NULL DEFAULT 0)''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_player_stats_rank ON player_stats (titles DESC, wins DESC)')
+    if backfill_stats:
+        _backfill_player_stats(c)
+    # Elo ratings (see ratings.py) and which archived tournaments they include
+    c.execute('''CREATE TABLE IF NOT EXISTS player_ratings (
+                    name TEXT PRIMARY KEY,
+                    rating REAL NOT NULL,
+                    games INTEGER NOT NULL DEFAULT 0)''')
+    c.execute('CREATE TABLE IF NOT EXISTS rated_tournaments (tournament_id TEXT PRIMARY KEY)')
+    # Change counters for derived caches ('history', ...)
+    c.execute('CREATE TABLE IF NOT EXISTS data_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+    _migrate_tournament_state(c)
+
+def _schema_v2(c):
+    """Undo/redo log: one row per manager action, plus periodic full snapshots"""
+    c.execute('''CREATE TABLE IF NOT EXISTS actions (
+                    tournament_id INTEGER NOT NULL,
+                    seq INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    label TEXT,
+                    delta TEXT NOT NULL,
+                    undone INTEGER NOT NULL DEFAULT 0,
+                    created_at DATETIME,
+                    PRIMARY KEY (tournament_id, seq)) WITHOUT ROWID''')
+    c.execute('''CREATE TABLE IF NOT EXISTS snapshots (
+                    tournament_id INTEGER NOT NULL,
+                    seq INTEGER NOT NULL,
+                    state TEXT NOT NULL,
+                    PRIMARY KEY (tournament_id, seq)) WITHOUT ROWID''')
 
-# ... (Keep get_all_players, add_player_to_db, update_participation, save_bracket_state, load_bracket_state exactly as they were) ...
-def get_all_players():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.execute('SELECT name FROM players ORDER BY participation DESC, name ASC')
-    players = [r[0] for r in cursor.fetchall()]
-    conn.close()
-    return players
+def _schema_v3(c):
+    """Table calls for the scheduler (see scheduler.py); times are epoch seconds"""
+    _add_column_if_missing(c, 'tournaments', 'table_count', 'INTEGER NOT NULL DEFAULT 4')
+    c.execute('''CREATE TABLE IF NOT EXISTS table_calls (
+                    tournament_id INTEGER NOT NULL,
+                    match_id TEXT NOT NULL,
+                    table_no INTEGER NOT NULL,
+                    p1 TEXT,
+                    p2 TEXT,
+                    called_at REAL NOT NULL,
+                    finished_at REAL)''')
+    # At most one open call per table and per match
+    c.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_calls_open_table
+                 ON table_calls (tournament_id, table_no) WHERE finished_at IS NULL''')
+    c.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_calls_open_match
+                 ON table_calls (tournament_id, match_id) WHERE finished_at IS NULL''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_calls_finished ON table_calls (tournament_id, finished_at)')
 
+def _schema_v4(c):
+    """Player directory: case-insensitive prefix search and the recent/frequent quick picks"""
+    _add_column_if_missing(c, 'players', 'last_played', 'DATETIME')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_players_name_nocase ON players (name COLLATE NOCASE)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_players_frequent ON players (participation DESC, name)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_players_recent ON players (last_played DESC, name)')
+    c.execute('''UPDATE players SET last_played =
+                     (SELECT MAX(timestamp) FROM match_history WHERE p1 = players.name OR p2 = players.name)''')
+
+# Append new steps at the end; never edit one that has shipped
+MIGRATIONS = [_schema_v1, _schema_v2, _schema_v3, _schema_v4]
+
+def _table_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)).fetchone() is not None
+
+def _bump_data_version(conn, name):
+    conn.execute('''INSERT INTO data_versions (name, version) VALUES (?, 1)
+                    ON CONFLICT(name) DO UPDATE SET version = version + 1''', (name,))
+
+def get_data_version(name):
+    """Counter bumped whenever the named data set changes (0 if never)"""
+    with get_connection() as conn:
+        row = conn.execute('SELECT version FROM data_versions WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else 0
+
+def _add_column_if_missing(conn, table, column, decl):
+    columns = [r[1] for r in conn.execute(f'PRAGMA table_info({table})')]
+    if column not in columns:
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {decl}')
+
+def _migrate_tournament_state(conn):
+    """One-time move of the old single JSON blob rows into tournaments/matches"""
+    if not _table_exists(conn, 'tournament_state'): return
+
+    for tournament_id, data in conn.execute('SELECT id, data FROM tournament_state').fetchall():
+        if data:
+            _write_bracket(conn, tournament_id, json.loads(data), {})
+    conn.execute('DROP TABLE tournament_state')
+
+def _backfill_player_stats(conn):
+    """One-time aggregation of the history that predates player_stats"""
+    conn.execute('''INSERT INTO player_stats (name, wins, losses, titles, tournaments_played)
+                    SELECT name, SUM(won), SUM(1 - won), SUM(title), COUNT(DISTINCT tournament_id) FROM (
+                        SELECT p1 AS name, tournament_id, winner = p1 AS won,
+                               match_label = 'F1-1' AND winner = p1 AS title
+                        FROM match_history WHERE p1 != 'BYE' AND p2 != 'BYE'
+                        UNION ALL
+                        SELECT p2, tournament_id, winner = p2, match_label = 'F1-1' AND winner = p2
+                        FROM match_history WHERE p1 != 'BYE' AND p2 != 'BYE'
+                    ) GROUP BY name''')
+
+# ... (Keep add_player_to_db, update_participation, save_bracket_state, load_bracket_state exactly as they were) ...
 def add_player_to_db(name):
-    conn = sqlite3.connect(DB_FILE)
     try:
-        conn.execute('INSERT INTO players (name, participation) VALUES (?, 0)', (name,))
-        conn.commit()
+        with transaction() as conn:
+            conn.execute('INSERT INTO players (name, participation) VALUES (?, 0)', (name,))
+            _bump_data_version(conn, 'roster')
     except sqlite3.IntegrityError:
         pass
-    conn.close()
+
+def normalize_player_name(name):
+    """Trimmed, single-spaced name; None for blanks and the reserved BYE"""
+    name = " ".join(str(name).split())
+    return name if name and name.upper() != "BYE" else None
+
+@perf.timed('db.add_players')
+def add_players(names):
+    """
+    Bulk roster import in one transaction. Names are normalized and
+    deduplicated ignoring case; a name already on the roster keeps its
+    spelling. Returns (added, existing) name lists.
+    """
+    unique = {}
+    for name in names:
+        name = normalize_player_name(name)
+        if name:
+            unique.setdefault(name.lower(), name)
+    if not unique:
+        return [], []
+
+    candidates = list(unique.values())
+    with transaction() as conn:
+        existing = {}
+        for i in range(0, len(candidates), 500):
+            chunk = candidates[i:i + 500]
+            cursor = conn.execute(f'''SELECT name FROM players
+                                      WHERE name COLLATE NOCASE IN ({','.join('?' * len(chunk))})''', chunk)
+            for (name,) in cursor:
+                existing.setdefault(name.lower(), name)
+        added = [name for key, name in unique.items() if key not in existing]
+        conn.executemany('INSERT OR IGNORE INTO players (name, participation) VALUES (?, 0)',
+                         [(name,) for name in added])
+        if added:
+            _bump_data_version(conn, 'roster')
+    return added, [existing[key] for key in unique if key in existing]
 
 def update_participation(player_names):
-    conn = sqlite3.connect(DB_FILE)
-    data = [(name,) for name in player_names]
-    conn.executemany('UPDATE players SET participation = participation + 1 WHERE name = ?', data)
-    conn.commit()
-    conn.close()
-
-def save_bracket_state(bracket_data):
-    conn = sqlite3.connect(DB_FILE)
-    data_str = json.dumps(bracket_data) if bracket_data else None
-    if data_str is None:
-        conn.execute('DELETE FROM tournament_state WHERE id=1')
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    data = [(timestamp, name) for name in player_names]
+    with transaction() as conn:
+        conn.executemany('''UPDATE players SET participation = participation + 1, last_played = ?
+                            WHERE name = ?''', data)
+        _bump_data_version(conn, 'roster')
+
+# --- PLAYER DIRECTORY ---
+# Lookups walk the NOCASE name index as a prefix range (LIKE 'abc%'), so a
+# page of results costs the same for fifty or fifty thousand players. Every
+# write to players bumps the 'roster' data version, which the setup view
+# uses as its cache key.
+PLAYER_PAGE_SIZE = 20
+QUICK_PICKS = 10
+
+def _like_prefix(prefix):
+    return prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+@perf.timed('db.search_players')
+def search_players(prefix, offset=0, limit=PLAYER_PAGE_SIZE):
+    """One alphabetical page of names starting with prefix (any case): (names, more after this page)"""
+    with get_connection() as conn:
+        rows = conn.execute('''SELECT name FROM players WHERE name LIKE ? ESCAPE '\\'
+                               ORDER BY name COLLATE NOCASE LIMIT ? OFFSET ?''',
+                            (_like_prefix(prefix), limit + 1, offset)).fetchall()
+    return [r[0] for r in rows[:limit]], len(rows) > limit
+
+def count_players(prefix=""):
+    with get_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM players WHERE name LIKE ? ESCAPE '\\'",
+                            (_like_prefix(prefix),)).fetchone()[0]
+
+def get_quick_picks(limit=QUICK_PICKS):
+    """(most frequent players, most recently played) for one-click adds"""
+    with get_connection() as conn:
+        frequent = conn.execute('SELECT name FROM players ORDER BY participation DESC, name LIMIT ?',
+                                (limit,)).fetchall()
+        recent = conn.execute('''SELECT name FROM players WHERE last_played IS NOT NULL
+                                 ORDER BY last_played DESC, name LIMIT ?''', (limit,)).fetchall()
+    return [r[0] for r in frequent], [r[0] for r in recent]
+
+# --- BRACKET STORAGE ---
+# Each match is a row in `matches`. We remember the rows this process last
+# wrote per tournament (and the version that write produced) so a save only
+# touches the matches that changed. Every write bumps tournaments.version,
+# and the parsed bracket is cached process-wide per version so unchanged
+# reloads cost one integer read.
+#
+# Concurrent managers: writers pass the version their bracket was loaded at
+# (expected_version) and the save is a compare-and-swap on it, raising
+# StaleStateError if someone else saved first. apply_action() handles that by
+# re-applying the change to the fresh state, so no result is lost.
+SAVE_ATTEMPTS = 5
+
+_saved_rows = {}
+_saved_versions = {}
+_saved_lock = threading.Lock()
+_bracket_cache = {}
+
+class StaleStateError(Exception):
+    """The tournament was saved by someone else since the caller loaded it"""
+
+    def __init__(self, tournament_id, expected, actual):
+        super().__init__(f"Tournament {tournament_id} is at version {actual}, expected {expected}")
+        self.tournament_id = tournament_id
+        self.expected = expected
+        self.actual = actual
+
+def _bracket_rows(bracket_data):
+    """match_id -> row tuple for every populated match in the bracket"""
+    rows = {}
+    for section in SECTIONS:
+        for r_idx, round_matches in enumerate(bracket_data.get(section, [])):
+            for m in round_matches:
+                if not (m['p1'] or m['p2'] or m['winner']):
+                    continue
+                rows[m['id']] = (section, r_idx + 1, int(m['id'].split('-')[1]),
+                                 m['p1'], m['p2'], m['winner'], m['loser'],
+                                 m.get('next_w'), m.get('next_l'))
+    return rows
+
+def _match_row(m):
+    prefix, round_no, idx = gl.parse_match_id(m['id'])
+    return (gl.SECTIONS[prefix], round_no, idx, m['p1'], m['p2'], m['winner'], m['loser'],
+            m.get('next_w'), m.get('next_l'))
+
+def _write_bracket(conn, tournament_id, bracket_data, known_rows, match_ids=None):
+    """
+    Writes the difference between bracket_data and known_rows. Returns the new rows.
+    match_ids (e.g. from a journal delta) limits the comparison to those matches.
+    """
+    if match_ids is None:
+        rows = _bracket_rows(bracket_data)
+        candidates = set(rows) | set(known_rows)
+    else:
+        graph = gl.get_graph(bracket_data)
+        rows = dict(known_rows)
+        candidates = set(match_ids)
+        for match_id in candidates:
+            m = graph.get(match_id)
+            if m and (m['p1'] or m['p2'] or m['winner']):
+                rows[match_id] = _match_row(m)
+            else:
+                rows.pop(match_id, None)
+    meta = json.dumps(bracket_data.get('meta', {}))
+    conn.execute('''INSERT INTO tournaments (id, meta, w_rounds, l_rounds, version, created_at) VALUES (?, ?, ?, ?, 1, ?)
+                    ON CONFLICT(id) DO UPDATE SET meta=excluded.meta, w_rounds=excluded.w_rounds,
+                    l_rounds=excluded.l_rounds, version=tournaments.version + 1''',
+                 (tournament_id, meta, len(bracket_data.get('winners', [])), len(bracket_data.get('losers', [])),
+                  datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+    changed = [(tournament_id, match_id) + rows[match_id] for match_id in candidates
+               if match_id in rows and known_rows.get(match_id) != rows[match_id]]
+    removed = [(tournament_id, match_id) for match_id in candidates if match_id in known_rows and match_id not in rows]
+    if perf.ENABLED:
+        perf.count("db_rows_written", len(changed) + len(removed))
+        perf.count("db_bytes_written", len(meta) + sum(_row_size(r) for r in changed))
+    if changed:
+        conn.executemany('''INSERT OR REPLACE INTO matches
+                            (tournament_id, match_id, section, round, idx, p1, p2, winner, loser, next_w, next_l)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', changed)
+    if removed:
+        conn.executemany('DELETE FROM matches WHERE tournament_id = ? AND match_id = ?', removed)
+    return rows
+
+def _check_version(conn, tournament_id, expected_version):
+    """Current state version; raises StaleStateError if it is not expected_version (None skips the check)"""
+    row = conn.execute('SELECT version FROM tournaments WHERE id = ?', (tournament_id,)).fetchone()
+    version = row[0] if row else 0
+    if expected_version is not None and version != expected_version:
+        raise StaleStateError(tournament_id, expected_version, version)
+    return version
+
+def _known_rows(conn, tournament_id, version):
+    """(rows as of version, whether they came from our last write) for the save diff"""
+    if _saved_versions.get(tournament_id) == version and tournament_id in _saved_rows:
+        return _saved_rows[tournament_id], True
+    # Another process wrote since (or we never did): diff against the table itself
+    return _read_rows(conn, tournament_id), False
+
+def _read_rows(conn, tournament_id, sections=None):
+    query = '''SELECT match_id, section, round, idx, p1, p2, winner, loser, next_w, next_l
+                 FROM matches WHERE tournament_id = ?'''
+    params = [tournament_id]
+    if sections:
+        query += f" AND section IN ({','.join('?' * len(sections))})"
+        params += list(sections)
+    query += ' ORDER BY section, round, idx'
+    rows = {r[0]: tuple(r[1:]) for r in conn.execute(query, params)}
+    if perf.ENABLED:
+        perf.count("db_rows_read", len(rows))
+        perf.count("db_bytes_read", sum(_row_size(r) for r in rows.values()))
+    return rows
+
+def _row_size(row):
+    """Rough serialized size of a matches row (text columns + 8 bytes per number)"""
+    return sum(len(v) if isinstance(v, str) else 8 for v in row if v is not None)
+
+def _build_bracket(t, rows, sections):
+    meta, w_rounds, l_rounds = t
+    round_counts = {'winners': w_rounds, 'losers': l_rounds, 'finals': 1}
+    bracket = {section: [[] for _ in range(round_counts[section])] for section in sections}
+    bracket['meta'] = json.loads(meta)
+
+    for match_id, (section, round_no, _, p1, p2, winner, loser, next_w, next_l) in rows.items():
+        match = {"id": match_id, "p1": p1, "p2": p2, "winner": winner, "loser": loser, "next_w": next_w}
+        if section == 'winners':
+            match['next_l'] = next_l
+        bracket[section][round_no - 1].append(match)
+    return bracket
+
+def _copy_bracket(bracket, sections=SECTIONS):
+    """Private copy a caller may mutate without touching the shared snapshot"""
+    copy = {section: [[dict(m) for m in r] for r in bracket[section]] for section in sections}
+    copy['meta'] = dict(bracket['meta'])
+    return copy
+
+# --- TOURNAMENTS ---
+@perf.timed('db.create_tournament')
+def create_tournament(name, bracket_data):
+    """Starts a new tournament next to any running ones. Returns its id."""
+    with _saved_lock, transaction() as conn:
+        cursor = conn.execute("INSERT INTO tournaments (name, status, created_at) VALUES (?, 'active', ?)",
+                              (name, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        tournament_id = cursor.lastrowid
+        rows = _write_bracket(conn, tournament_id, bracket_data, {})
+        _cache_saved(conn, tournament_id, bracket_data, rows)
+    return tournament_id
+
+@perf.timed('db.list_tournaments')
+def list_tournaments(status='active'):
+    """[(id, name)] of tournaments with the given status, oldest first"""
+    with get_connection() as conn:
+        cursor = conn.execute('SELECT id, name FROM tournaments WHERE status = ? ORDER BY id', (status,))
+        return [(r[0], r[1] or f"Tournament #{r[0]}") for r in cursor.fetchall()]
+
+@perf.timed('db.get_state_version')
+def get_state_version(tournament_id):
+    """Monotonic counter bumped on every write to the tournament (0 if it never existed)"""
+    with get_connection() as conn:
+        row = conn.execute('SELECT version FROM tournaments WHERE id = ?', (tournament_id,)).fetchone()
+    return row[0] if row else 0
+
+def get_state_versions(status='active'):
+    """{tournament id: state version} for every tournament with the given status, or all of them for None"""
+    with get_connection() as conn:
+        if status is None:
+            return dict(conn.execute('SELECT id, version FROM tournaments').fetchall())
+        return dict(conn.execute('SELECT id, version FROM tournaments WHERE status = ?', (status,)).fetchall())
+
+@perf.timed('db.save_bracket_state')
+def save_bracket_state(bracket_data, tournament_id, action=None, expected_version=None):
+    """
+    Saves the bracket. action = (kind, label, delta) from a game_logic journal
+    also logs the step for undo/redo and limits the write to its matches.
+    With expected_version (the version the bracket was loaded at) the save
+    only goes through if nobody saved since, else StaleStateError.
+    """
+    with _saved_lock, transaction() as conn:
+        version = _check_version(conn, tournament_id, expected_version)
+        if not bracket_data:
+            # Keep the row (and its version) so cached readers notice the reset
+            conn.execute('DELETE FROM matches WHERE tournament_id = ?', (tournament_id,))
+            _clear_actions(conn, tournament_id)
+            conn.execute('UPDATE tournaments SET meta = NULL, version = version + 1 WHERE id = ?', (tournament_id,))
+            _saved_rows.pop(tournament_id, None)
+            _bracket_cache.pop(tournament_id, None)
+            return
+
+        known, ours = _known_rows(conn, tournament_id, version)
+        # An empty delta saves nothing worth undoing; diff every row in case the journal missed a change
+        match_ids = [d[0] for d in action[2]] if action and action[2] and ours else None
+        rows = _write_bracket(conn, tournament_id, bracket_data, known, match_ids)
+        if action and action[2]:
+            _log_action(conn, tournament_id, action, bracket_data)
+        _cache_saved(conn, tournament_id, bracket_data, rows)
+
+def _cache_saved(conn, tournament_id, bracket_data, rows):
+    """Remembers what was just written, under the version the write produced"""
+    version = conn.execute('SELECT version FROM tournaments WHERE id = ?', (tournament_id,)).fetchone()[0]
+    _saved_rows[tournament_id] = rows
+    _saved_versions[tournament_id] = version
+    _bracket_cache[tournament_id] = (version, _copy_bracket(bracket_data))
+
+def retry_on_conflict(tournament_id, write):
+    """
+    Optimistic write loop: calls write(bracket, version) on a private copy of
+    the latest state and, whenever it raises StaleStateError, again on a
+    fresh load. Returns write's result (None if there is no bracket).
+    """
+    for attempt in range(SAVE_ATTEMPTS):
+        version = get_state_version(tournament_id)
+        bracket_data = load_bracket_state(tournament_id, version=version)
+        if not bracket_data:
+            return None
+        try:
+            return write(bracket_data, version)
+        except StaleStateError:
+            perf.count("db_conflicts")
+            if attempt == SAVE_ATTEMPTS - 1:
+                raise
+
+@perf.timed('db.apply_action')
+def apply_action(tournament_id, kind, label, change):
+    """
+    Runs change(bracket) -> [error messages] on the latest state and saves it
+    as one undoable action. If another manager saved in between, the change
+    is re-applied on top of their state instead of overwriting it. Returns
+    the errors; nothing is saved when there are any.
+    """
+    def write(bracket_data, version):
+        gl.start_journal(bracket_data)
+        try:
+            errors = change(bracket_data)
+        finally:
+            # Always closed, so the graph is never left pinned in the cache
+            delta = gl.take_journal(bracket_data)
+        if not errors:
+            save_bracket_state(bracket_data, tournament_id, (kind, label, delta), expected_version=version)
+        return errors
+
+    errors = retry_on_conflict(tournament_id, write)
+    return ["No active tournament found."] if errors is None else errors
+
+@perf.timed('db.load_bracket_state')
+def load_bracket_state(tournament_id, sections=None, readonly=False, version=None):
+    """
+    Returns the bracket dict, reusing the process-wide parsed copy while the
+    state version is unchanged. readonly=True hands back that shared snapshot
+    itself (never mutate it); otherwise the caller gets a private copy.
+    Pass e.g. sections=('winners',) to get just part of it; only those keys
+    (plus meta) are returned then. Callers that already polled the version can
+    pass it in to skip the version query.
+    """
+    cached = _bracket_cache.get(tournament_id)
+    if version is None and cached:
+        version = get_state_version(tournament_id)
+    if cached and cached[0] == version:
+        snapshot = cached[1]
     else:
-        conn.execute('INSERT OR REPLACE INTO tournament_state (id, data) VALUES (1, ?)', (data_str,))
-    conn.commit()
-    conn.close()
-
-def load_bracket_state():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.execute('SELECT data FROM tournament_state WHERE id=1')
-    row = cursor.fetchone()
-    conn.close()
-    if row and row[0]:
-        return json.loads(row[0])
-    return None
+        with get_connection() as conn:
+            # One read transaction so the version matches the rows we read
+            conn.execute('BEGIN')
+            t = conn.execute('SELECT meta, w_rounds, l_rounds, version FROM tournaments WHERE id = ?',
+                             (tournament_id,)).fetchone()
+            if not t or t[0] is None:
+                return None
+            if sections and not readonly:
+                # Partial reads skip the shared cache and fetch only what was asked for
+                return _build_bracket(t[:3], _read_rows(conn, tournament_id, sections), sections)
+            rows = _read_rows(conn, tournament_id)
+            conn.execute('COMMIT')
+        snapshot = _build_bracket(t[:3], rows, SECTIONS)
+        _bracket_cache[tournament_id] = (t[3], snapshot)
+
+    if readonly:
+        if sections:
+            return {**{section: snapshot[section] for section in sections}, 'meta': snapshot['meta']}
+        return snapshot
+    return _copy_bracket(snapshot, sections or SECTIONS)
+
+# --- UNDO HISTORY ---
+# Every manager action is logged with its journal delta (the before/after
+# state of just the matches it touched). Undo/redo walk the log and apply
+# deltas, so the cost follows the number of actions, not the bracket size.
+# Rows with undone = 1 form the redo stack; a new action discards them.
+# Every SNAPSHOT_EVERY actions the full bracket is stored too (bracket_codec,
+# deflated), so a long jump back restores the nearest snapshot and replays
+# forward from there. Snapshots written as JSON text still load.
+SNAPSHOT_EVERY = 25
+
+def _log_action(conn, tournament_id, action, bracket_data):
+    kind, label, delta = action
+    conn.execute('DELETE FROM actions WHERE tournament_id = ? AND undone = 1', (tournament_id,))
+    seq = conn.execute('SELECT COALESCE(MAX(seq), 0) + 1 FROM actions WHERE tournament_id = ?',
+                       (tournament_id,)).fetchone()[0]
+    # Snapshots taken on the discarded redo branch no longer describe this timeline
+    conn.execute('DELETE FROM snapshots WHERE tournament_id = ? AND seq >= ?', (tournament_id, seq))
+    conn.execute('''INSERT INTO actions (tournament_id, seq, kind, label, delta, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?)''',
+                 (tournament_id, seq, kind, label, json.dumps(delta), datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    if seq % SNAPSHOT_EVERY == 0:
+        conn.execute('INSERT INTO snapshots (tournament_id, seq, state) VALUES (?, ?, ?)',
+                     (tournament_id, seq, bracket_codec.encode(bracket_data, compress=True)))
+
+def _clear_actions(conn, tournament_id):
+    conn.execute('DELETE FROM actions WHERE tournament_id = ?', (tournament_id,))
+    conn.execute('DELETE FROM snapshots WHERE tournament_id = ?', (tournament_id,))
+
+def list_actions(tournament_id, limit=50):
+    """Newest first: [(seq, kind, label, created_at, undone)]"""
+    with get_connection() as conn:
+        cursor = conn.execute('''SELECT seq, kind, label, created_at, undone FROM actions
+                                 WHERE tournament_id = ? ORDER BY seq DESC LIMIT ?''', (tournament_id, limit))
+        return [(r[0], r[1], r[2], r[3], bool(r[4])) for r in cursor.fetchall()]
+
+@perf.timed('db.undo_actions')
+def undo_actions(tournament_id, bracket_data, count=1, to_seq=None, expected_version=None):
+    """
+    Reverts the last `count` actions, or every action after `to_seq`, and
+    saves. Returns (bracket, number undone); the bracket is a new dict when a
+    snapshot was restored, so callers should use the returned one.
+    expected_version works as in save_bracket_state.
+    """
+    with _saved_lock, transaction() as conn:
+        version = _check_version(conn, tournament_id, expected_version)
+        if to_seq is None:
+            steps = conn.execute('''SELECT seq, delta FROM actions WHERE tournament_id = ? AND undone = 0
+                                    ORDER BY seq DESC LIMIT ?''', (tournament_id, count)).fetchall()
+        else:
+            steps = conn.execute('''SELECT seq, delta FROM actions WHERE tournament_id = ? AND undone = 0
+                                    AND seq > ? ORDER BY seq DESC''', (tournament_id, to_seq)).fetchall()
+        if not steps:
+            return bracket_data, 0
+
+        target = steps[-1][0] - 1
+        snapshot = None
+        if len(steps) > SNAPSHOT_EVERY:
+            snapshot = conn.execute('''SELECT seq, state FROM snapshots WHERE tournament_id = ? AND seq <= ?
+                                       ORDER BY seq DESC LIMIT 1''', (tournament_id, target)).fetchone()
+
+        known, ours = _known_rows(conn, tournament_id, version)
+        match_ids = None
+        if snapshot and target - snapshot[0] < len(steps):
+            bracket_data = bracket_codec.decode(snapshot[1])
+            for (delta,) in conn.execute('''SELECT delta FROM actions WHERE tournament_id = ?
+                                            AND seq > ? AND seq <= ? ORDER BY seq''',
+                                         (tournament_id, snapshot[0], target)):
+                gl.apply_delta(bracket_data, json.loads(delta))
+        else:
+            match_ids = set()
+            for _, delta in steps:
+                delta = json.loads(delta)
+                gl.apply_delta(bracket_data, delta, reverse=True)
+                match_ids.update(d[0] for d in delta)
+
+        conn.executemany('UPDATE actions SET undone = 1 WHERE tournament_id = ? AND seq = ?',
+                         [(tournament_id, seq) for seq, _ in steps])
+        rows = _write_bracket(conn, tournament_id, bracket_data, known, match_ids if ours else None)
+        _cache_saved(conn, tournament_id, bracket_data, rows)
+    return bracket_data, len(steps)
+
+@perf.timed('db.redo_actions')
+def redo_actions(tournament_id, bracket_data, count=1, expected_version=None):
+    """Re-applies the next `count` undone actions and saves. Returns the number redone."""
+    with _saved_lock, transaction() as conn:
+        version = _check_version(conn, tournament_id, expected_version)
+        steps = conn.execute('''SELECT seq, delta FROM actions WHERE tournament_id = ? AND undone = 1
+                                ORDER BY seq LIMIT ?''', (tournament_id, count)).fetchall()
+        if not steps:
+            return 0
+
+        match_ids = set()
+        for _, delta in steps:
+            delta = json.loads(delta)
+            gl.apply_delta(bracket_data, delta)
+            match_ids.update(d[0] for d in delta)
+
+        known, ours = _known_rows(conn, tournament_id, version)
+        conn.executemany('UPDATE actions SET undone = 0 WHERE tournament_id = ? AND seq = ?',
+                         [(tournament_id, seq) for seq, _ in steps])
+        rows = _write_bracket(conn, tournament_id, bracket_data, known, match_ids if ours else None)
+        _cache_saved(conn, tournament_id, bracket_data, rows)
+    return len(steps)
+
+def _rename_in_actions(conn, tournament_ids, old_name, new_name):
+    """Keeps logged deltas and snapshots in step with a player rename"""
+    def swap(state):
+        return state and [new_name if v == old_name else v for v in state]
+
+    for tid in tournament_ids:
+        rows = conn.execute('SELECT seq, delta FROM actions WHERE tournament_id = ?', (tid,)).fetchall()
+        updates = []
+        for seq, delta in rows:
+            delta = [[match_id, swap(before), swap(after)] for match_id, before, after in json.loads(delta)]
+            updates.append((json.dumps(delta), tid, seq))
+        conn.executemany('UPDATE actions SET delta = ? WHERE tournament_id = ? AND seq = ?', updates)
+
+        snapshots = conn.execute('SELECT seq, state FROM snapshots WHERE tournament_id = ?', (tid,)).fetchall()
+        for seq, state in snapshots:
+            bracket = bracket_codec.decode(state)
+            gl.rename_player(bracket, old_name, new_name)
+            conn.execute('UPDATE snapshots SET state = ? WHERE tournament_id = ? AND seq = ?',
+                         (bracket_codec.encode(bracket, compress=True), tid, seq))
 
 # --- NEW FEATURES ---
 
-def rename_player_in_active_tournament(old_name, new_name, bracket_data):
-    """Recursively finds and replaces a player name in the bracket JSON"""
-    if not bracket_data: return None
-    
-    # Helper to clean a list of matches
-    def clean_rounds(rounds_list):
-        for round_matches in rounds_list:
-            for m in round_matches:
-                if m['p1'] == old_name: m['p1'] = new_name
-                if m['p2'] == old_name: m['p2'] = new_name
-                if m['winner'] == old_name: m['winner'] = new_name
-                if m['loser'] == old_name: m['loser'] = new_name
-    
-    clean_rounds(bracket_data.get('winners', []))
-    clean_rounds(bracket_data.get('losers', []))
-    clean_rounds(bracket_data.get('finals', []))
-    
-    # Also update the Players Database
-    conn = sqlite3.connect(DB_FILE)
-    try:
-        # Create new record
-        conn.execute('INSERT INTO players (name) VALUES (?)', (new_name,))
-        # Copy participation stats if you want (optional, skipping for simplicity)
-        # Delete old record
-        conn.execute('DELETE FROM players WHERE name = ?', (old_name,))
-        conn.commit()
-    except sqlite3.IntegrityError:
-        pass # New name might already exist
-    conn.close()
-    
-    return bracket_data
+@perf.timed('db.rename_player')
+def rename_player(old_name, new_name, bracket_data=None):
+    """
+    Renames a player everywhere in one transaction: players (merged into
+    new_name if that already exists), every active bracket, match_history,
+    player_stats and player_ratings. Only rows holding the player are
+    touched, found through the name indexes. bracket_data (a caller's
+    private copy) is renamed in place as well. Raises ValueError if new_name
+    is already in one of the player's tournaments. Renaming a player to
+    their own name does nothing.
+    """
+    if old_name == new_name:
+        return bracket_data
+    params = {"old": old_name, "new": new_name}
+    with _saved_lock, transaction() as conn:
+        touched = conn.execute('SELECT tournament_id, match_id FROM matches WHERE p1 = :old OR p2 = :old',
+                               params).fetchall()
+        tournament_ids = sorted({tid for tid, _ in touched})
+        if tournament_ids:
+            marks = ','.join('?' * len(tournament_ids))
+            clash = conn.execute(f'''SELECT 1 FROM matches WHERE (p1 = ? OR p2 = ?)
+                                     AND tournament_id IN ({marks}) LIMIT 1''',
+                                 [new_name, new_name] + tournament_ids).fetchone()
+            if clash:
+                raise ValueError(f"{new_name} is already playing in that tournament")
+
+        # players: a rename, or a merge into an existing entry (participation adds up)
+        merged = conn.execute('''UPDATE players SET participation = participation +
+                                     (SELECT participation FROM players WHERE name = :old)
+                                 WHERE name = :new AND EXISTS (SELECT 1 FROM players WHERE name = :old)''',
+                              params).rowcount
+        if merged:
+            conn.execute('DELETE FROM players WHERE name = :old', params)
+        else:
+            conn.execute('UPDATE players SET name = :new WHERE name = :old', params)
+
+        # Live brackets
+        conn.execute('''UPDATE matches SET
+                            p1 = CASE p1 WHEN :old THEN :new ELSE p1 END,
+                            p2 = CASE p2 WHEN :old THEN :new ELSE p2 END,
+                            winner = CASE winner WHEN :old THEN :new ELSE winner END,
+                            loser = CASE loser WHEN :old THEN :new ELSE loser END
+                        WHERE p1 = :old OR p2 = :old''', params)
+        conn.executemany('UPDATE tournaments SET version = version + 1 WHERE id = ?',
+                         [(tid,) for tid in tournament_ids])
+        _rename_in_actions(conn, tournament_ids, old_name, new_name)
+        conn.execute('''UPDATE table_calls SET
+                            p1 = CASE p1 WHEN :old THEN :new ELSE p1 END,
+                            p2 = CASE p2 WHEN :old THEN :new ELSE p2 END
+                        WHERE p1 = :old OR p2 = :old''', params)
+
+        # History and the aggregates built from it
+        history_rows = sum(conn.execute(f'UPDATE match_history SET {col} = :new WHERE {col} = :old', params).rowcount
+                           for col in ('p1', 'p2', 'winner'))
+        stats_merged = conn.execute('''UPDATE player_stats SET
+                                           wins = wins + (SELECT wins FROM player_stats WHERE name = :old),
+                                           losses = losses + (SELECT losses FROM player_stats WHERE name = :old),
+                                           titles = titles + (SELECT titles FROM player_stats WHERE name = :old),
+                                           tournaments_played = tournaments_played +
+                                               (SELECT tournaments_played FROM player_stats WHERE name = :old)
+                                       WHERE name = :new AND EXISTS (SELECT 1 FROM player_stats WHERE name = :old)''',
+                                    params).rowcount
+        if stats_merged:
+            conn.execute('DELETE FROM player_stats WHERE name = :old', params)
+        else:
+            conn.execute('UPDATE player_stats SET name = :new WHERE name = :old', params)
+
+        rated = conn.execute('SELECT COUNT(*) FROM player_ratings WHERE name IN (:old, :new)', params).fetchone()[0]
+        if rated == 2:
+            # Two rating histories can't be added up; ratings.update_ratings() replays from scratch
+            conn.execute('DELETE FROM player_ratings')
+            conn.execute('DELETE FROM rated_tournaments')
+        else:
+            conn.execute('UPDATE player_ratings SET name = :new WHERE name = :old', params)
 
-def archive_tournament(bracket_data):
-    """Writes all finished matches to history and clears active state"""
-    if not bracket_data: return
+        if history_rows:
+            _bump_data_version(conn, 'history')
+        _bump_data_version(conn, 'roster')
 
-    conn = sqlite3.connect(DB_FILE)
-    tournament_id = str(uuid.uuid4())[:8] # Unique ID for this tourney
+        # Keep the save diff baselines in step with what was just written
+        for tid, match_id in touched:
+            row = _saved_rows.get(tid, {}).get(match_id)
+            if row:
+                names = tuple(new_name if v == old_name else v for v in row[3:7])
+                _saved_rows[tid][match_id] = row[:3] + names + row[7:]
+        for tid in tournament_ids:
+            if tid in _saved_versions:
+                _saved_versions[tid] += 1  # still current only if it was before the bump
+            _bracket_cache.pop(tid, None)
+
+    if bracket_data:
+        gl.rename_player(bracket_data, old_name, new_name)
+    return bracket_data
+
+@perf.timed('db.archive_tournament')
+def archive_tournament(tournament_id):
+    """
+    Writes all finished matches to history, marks the tournament archived and
+    clears its bracket. Everything happens in one write transaction that
+    first claims the still-active tournament, so a result saved just before
+    is included and a second manager archiving at the same time gets False
+    instead of counting the games twice.
+    """
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    history_rows = []
-    
-    # Gather all matches
-    all_rounds = bracket_data.get('winners', []) + bracket_data.get('losers', []) + bracket_data.get('finals', [])
-    
-    for round_matches in all_rounds:
-        for m in round_matches:
-            # Only save matches that actually happened
-            if m['winner'] and m['p1'] and m['p2']:
-                history_rows.append((
-                    str(uuid.uuid4()),
-                    tournament_id,
-                    m['id'],
-                    m['p1'],
-                    m['p2'],
-                    m['winner'],
-                    timestamp
-                ))
-    
-    if history_rows:
-        conn.executemany('''INSERT INTO match_history (id, tournament_id, match_label, p1, p2, winner, timestamp) 
-                            VALUES (?, ?, ?, ?, ?, ?, ?)''', history_rows)
-        conn.commit()
-    
-    conn.close()
\ No newline at end of file
+
+    with _saved_lock, transaction() as conn:
+        t = conn.execute("SELECT meta, w_rounds, l_rounds FROM tournaments WHERE id = ? AND status = 'active'",
+                         (tournament_id,)).fetchone()
+        if not t or t[0] is None:
+            return False
+        bracket_data = _build_bracket(t, _read_rows(conn, tournament_id), SECTIONS)
+
+        # Only save matches that actually happened
+        history_rows = [
+            (str(uuid.uuid4()), str(tournament_id), m['id'], m['p1'], m['p2'], m['winner'], timestamp)
+            for rounds in bracket_data['winners'] + bracket_data['losers'] + bracket_data['finals']
+            for m in rounds
+            if m['winner'] and m['p1'] and m['p2']
+        ]
+        stats_rows = _player_stats_deltas(bracket_data, history_rows)
+
+        claimed = conn.execute('''UPDATE tournaments SET status = 'archived', meta = NULL, version = version + 1
+                                  WHERE status = 'active' AND id = ?''', (tournament_id,)).rowcount
+        if not claimed:
+            return False
+        if history_rows:
+            conn.executemany('''INSERT INTO match_history (id, tournament_id, match_label, p1, p2, winner, timestamp) 
+                                VALUES (?, ?, ?, ?, ?, ?, ?)''', history_rows)
+        conn.executemany('''INSERT INTO player_stats (name, wins, losses, titles, tournaments_played)
+                            VALUES (?, ?, ?, ?, 1)
+                            ON CONFLICT(name) DO UPDATE SET
+                                wins = wins + excluded.wins,
+                                losses = losses + excluded.losses,
+                                titles = titles + excluded.titles,
+                                tournaments_played = tournaments_played + 1''', stats_rows)
+        _bump_data_version(conn, 'history')
+        conn.execute('DELETE FROM matches WHERE tournament_id = ?', (tournament_id,))
+        _clear_actions(conn, tournament_id)
+        _saved_rows.pop(tournament_id, None)
+        _bracket_cache.pop(tournament_id, None)
+    return True
+
+def _player_stats_deltas(bracket_data, history_rows):
+    """(name, wins, losses, titles) for everyone who took part; BYE games don't count"""
+    stats = {}
+    for rounds in bracket_data.get('winners', []) + bracket_data.get('losers', []) + bracket_data.get('finals', []):
+        for m in rounds:
+            for name in (m['p1'], m['p2']):
+                if name and name != "BYE":
+                    stats.setdefault(name, [0, 0, 0])
+
+    for _, _, _, p1, p2, winner, _ in history_rows:
+        if "BYE" in (p1, p2): continue
+        stats[winner][0] += 1
+        stats[p2 if winner == p1 else p1][1] += 1
+
+    finals = bracket_data.get('finals') or [[]]
+    champion = finals[0][0]['winner'] if finals[0] else None
+    if champion in stats:
+        stats[champion][2] += 1
+
+    return [(name, w, l, t) for name, (w, l, t) in stats.items()]
+
+@perf.timed('db.get_leaderboard')
+def get_leaderboard(limit=50):
+    """Top players from the precomputed player_stats table"""
+    with get_connection() as conn:
+        cursor = conn.execute('''SELECT s.name, s.titles, s.wins, s.losses, s.tournaments_played, r.rating
+                                 FROM player_stats s LEFT JOIN player_ratings r ON r.name = s.name
+                                 ORDER BY s.titles DESC, s.wins DESC LIMIT ?''', (limit,))
+        return cursor.fetchall()
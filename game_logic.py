@@ -1,6 +1,11 @@
 import random
 import math
+import threading
+import perf
 
+SECTIONS = {"W": "winners", "L": "losers", "F": "finals"}
+
+@perf.timed('logic.generate_bracket')
 def generate_bracket(players):
     players = players.copy()
     random.shuffle(players)
@@ -10,119 +15,332 @@ def generate_bracket(players):
     while len(players) < next_pow_2:
         players.append("BYE")
     
+    total = len(players)
+    w_count, l_count = round_counts(total)
+
+    # Only the rounds exist up front. Match records are created lazily the
+    # first time they gain a player; the links between them are arithmetic.
     bracket = {
-        "winners": [],
-        "losers": [],
-        "finals": [],
-        "meta": {"total_players": len(players)}
+        "winners": [[] for _ in range(w_count)],
+        "losers": [[] for _ in range(l_count)],
+        "finals": [[]],
+        "meta": {"total_players": total}
     }
 
-    # --- WINNERS BRACKET SKELETON ---
-    current_count = len(players) // 2
-    w_round_count = 0
-    while current_count >= 1:
-        w_round_count += 1
-        round_matches = []
-        for i in range(current_count):
-            match = {
-                "id": f"W{w_round_count}-{i+1}",
-                "p1": None, "p2": None,
-                "winner": None, "loser": None,
-                "next_w": None, "next_l": None 
-            }
-            if w_round_count == 1:
-                match['p1'] = players[i*2]
-                match['p2'] = players[i*2+1]
-                # No auto-win here logic anymore, manual control only
-            
-            round_matches.append(match)
-        bracket['winners'].append(round_matches)
-        current_count //= 2
-
-    # --- LOSERS BRACKET SKELETON ---
-    # Standard Double Elim Pattern for N players
-    l_match_counts = []
-    count = len(players) // 4
-    for _ in range(len(bracket['winners']) - 1):
-        l_match_counts.append(count) # Drop Round
-        l_match_counts.append(count) # Advancement Round
-        count //= 2
-        
-    for r_idx, count in enumerate(l_match_counts):
-        round_matches = []
-        for i in range(count):
-            match = {
-                "id": f"L{r_idx+1}-{i+1}",
-                "p1": None, "p2": None,
-                "winner": None, "loser": None,
-                "next_w": None
-            }
-            round_matches.append(match)
-        bracket['losers'].append(round_matches)
-
-    # --- FINALS SKELETON ---
-    bracket['finals'].append([{
-        "id": "F1-1",
+    # --- WINNERS ROUND 1 ---
+    # No auto-win here logic anymore, manual control only
+    for i in range(total // 2):
+        match = _new_match(f"W1-{i+1}", total)
+        match['p1'] = players[i*2]
+        match['p2'] = players[i*2+1]
+        bracket['winners'][0].append(match)
+
+    return bracket
+
+# --- CLOSED-FORM TOPOLOGY ---
+# Standard double elim for N (power of 2) players:
+#   W round r has N / 2^r matches, W1 losers pair up into L1,
+#   W round r >= 2 drops 1-to-1 into L round 2r-2,
+#   L odd rounds feed the next round 1-to-1, L even rounds compress 2 -> 1,
+#   the last W and L rounds both feed F1-1.
+
+def round_counts(total_players):
+    """(winners rounds, losers rounds) for a padded field size"""
+    w_count = total_players.bit_length() - 1
+    return w_count, max(0, 2 * (w_count - 1))
+
+def match_count(prefix, round_no, total_players):
+    """Number of matches in a round"""
+    if prefix == "W": return total_players >> round_no
+    if prefix == "L": return total_players >> (2 + (round_no - 1) // 2)
+    return 1
+
+def parse_match_id(match_id):
+    """'L3-2' -> ('L', 3, 2)"""
+    r, i = match_id[1:].split("-")
+    return match_id[0], int(r), int(i)
+
+def next_match_ids(match_id, total_players):
+    """(next_w, next_l) for a match id, None where there is no edge"""
+    prefix, r, i = parse_match_id(match_id)
+    w_count, l_count = round_counts(total_players)
+
+    if prefix == "W":
+        next_w = f"W{r+1}-{(i+1)//2}" if r < w_count else "F1-1"
+        # Loser drop: W1 -> L1 (two into one), W2 -> L2, W3 -> L4, ...
+        if r == 1:
+            next_l = f"L1-{(i+1)//2}" if l_count >= 1 else None
+        else:
+            next_l = f"L{2*r-2}-{i}" if 2*r - 2 <= l_count else None
+        return next_w, next_l
+
+    if prefix == "L":
+        if r == l_count: return "F1-1", None
+        if r % 2 == 0:
+            # L2->L3 (Compression Round: 2 matches -> 1 match)
+            return f"L{r+1}-{(i+1)//2}", None
+        # L1->L2 (Direct Round: 2 matches -> 2 matches)
+        return f"L{r+1}-{i}", None
+
+    return None, None
+
+def feeder_match_ids(match_id, total_players):
+    """Ids of the matches whose winner or loser lands in match_id"""
+    prefix, r, i = parse_match_id(match_id)
+    w_count, l_count = round_counts(total_players)
+
+    if prefix == "W":
+        if r == 1: return []
+        return [f"W{r-1}-{2*i-1}", f"W{r-1}-{2*i}"]
+
+    if prefix == "L":
+        if r == 1: return [f"W1-{2*i-1}", f"W1-{2*i}"]
+        if r % 2 == 0: return [f"L{r-1}-{i}", f"W{r//2+1}-{i}"]
+        return [f"L{r-1}-{2*i-1}", f"L{r-1}-{2*i}"]
+
+    feeders = [f"W{w_count}-1"]
+    if l_count: feeders.append(f"L{l_count}-1")
+    return feeders
+
+def _new_match(match_id, total_players):
+    next_w, next_l = next_match_ids(match_id, total_players)
+    match = {
+        "id": match_id,
         "p1": None, "p2": None,
         "winner": None, "loser": None,
-        "next_w": None 
-    }])
+        "next_w": next_w
+    }
+    if match_id.startswith("W"):
+        match['next_l'] = next_l
+    return match
+
+def round_matches(bracket, prefix, round_no):
+    """
+    Every match of a round in bracket order. Matches nobody has reached yet
+    come back as empty placeholders that are NOT added to the bracket.
+    """
+    graph = get_graph(bracket)
+    total = graph.total_players
+    matches = []
+    for i in range(match_count(prefix, round_no, total)):
+        match_id = f"{prefix}{round_no}-{i+1}"
+        matches.append(graph.get(match_id) or _new_match(match_id, total))
+    return matches
+
+# --- MATCH GRAPH ---
+# Built once per loaded bracket and reused by every lookup below, so a single
+# "Win" click no longer rescans winners + losers + finals for each slot it fills.
+# Shared by every Streamlit script thread, so changes go through the lock.
+_GRAPH_CACHE_SIZE = 16
+_graphs = {}
+_graphs_lock = threading.Lock()
+
+class MatchGraph:
+    """id -> match index over the records that exist, plus the arithmetic edges"""
+
+    def __init__(self, bracket):
+        self.bracket = bracket
+        self.total_players = bracket['meta']['total_players']
+        self.matches = {}
+        # player -> ids of the matches they sit in (p1/p2), kept in step by set_slot
+        self.occurrences = {}
+        # match id -> state before its first change, while a journal is open
+        self.journal = None
+        # ids of matches that can be played right now, kept in step by every write
+        self.ready = set()
+
+        all_rounds = bracket['winners'] + bracket['losers'] + bracket['finals']
+        for rounds in all_rounds:
+            for m in rounds:
+                self.matches[m['id']] = m
+                for name in (m['p1'], m['p2']):
+                    if name and name != "BYE":
+                        self.occurrences.setdefault(name, set()).add(m['id'])
+                self._update_ready(m)
+
+    def get(self, match_id):
+        return self.matches.get(match_id)
+
+    def ensure(self, match_id):
+        """Returns the match record, creating it in its round the first time it is needed"""
+        match = self.matches.get(match_id)
+        if match is None:
+            self.touch(match_id)
+            prefix, r, _ = parse_match_id(match_id)
+            match = _new_match(match_id, self.total_players)
+            self.bracket[SECTIONS[prefix]][r - 1].append(match)
+            self.matches[match_id] = match
+        return match
+
+    def discard(self, match_id):
+        """Drops a match record that no longer holds anything"""
+        self.touch(match_id)
+        self.ready.discard(match_id)
+        match = self.matches.pop(match_id, None)
+        if match is not None:
+            prefix, r, _ = parse_match_id(match_id)
+            self.bracket[SECTIONS[prefix]][r - 1].remove(match)
+
+    def set_slot(self, match, slot, name):
+        """Writes p1/p2 of a match and updates the occurrence index"""
+        self.touch(match['id'])
+        old = match[slot]
+        match[slot] = name
+        other = match['p2' if slot == 'p1' else 'p1']
+        if old and old != other and old in self.occurrences:
+            self.occurrences[old].discard(match['id'])
+            if not self.occurrences[old]: del self.occurrences[old]
+        if name and name != "BYE":
+            self.occurrences.setdefault(name, set()).add(match['id'])
+        self._update_ready(match)
+
+    def set_result(self, match, winner, loser):
+        self.touch(match['id'])
+        match['winner'] = winner
+        match['loser'] = loser
+        self._update_ready(match)
+
+    def _update_ready(self, match):
+        """Ready = two real players and no result yet (BYE matches need no table)"""
+        if (match['p1'] and match['p2'] and not match['winner']
+                and match['p1'] != "BYE" and match['p2'] != "BYE"):
+            self.ready.add(match['id'])
+        else:
+            self.ready.discard(match['id'])
+
+    def touch(self, match_id):
+        """Remembers a match's state before its first change in the open journal"""
+        if self.journal is not None and match_id not in self.journal:
+            self.journal[match_id] = match_state(self.matches.get(match_id))
+
+    def targets(self, match_id):
+        """(next_w, next_l) of a match, None where there is no edge"""
+        return next_match_ids(match_id, self.total_players)
+
+    def feeders_of(self, match_id):
+        """Ids of the matches whose winner or loser lands in match_id"""
+        return feeder_match_ids(match_id, self.total_players)
+
+def get_graph(bracket):
+    """Returns the cached MatchGraph for this bracket dict, building it once"""
+    graph = _graphs.get(id(bracket))
+    if graph is not None and graph.bracket is bracket:
+        return graph
+
+    graph = MatchGraph(bracket)
+    with _graphs_lock:
+        if len(_graphs) >= _GRAPH_CACHE_SIZE:
+            # Graphs with an open journal are pinned; rebuilding one would lose the journal
+            oldest = next((key for key, cached in _graphs.items() if cached.journal is None), None)
+            if oldest is not None:
+                _graphs.pop(oldest)
+        _graphs[id(bracket)] = graph
+    return graph
+
+@perf.timed('logic.record_result')
+def record_result(bracket, match_id, winner):
+    """
+    Records a single match result and pushes the winner/loser along that
+    match's next_w/next_l edges only. Matches that can only go one way (a
+    player facing a BYE, or a slot whose feeders are all done and only ever
+    delivered a BYE) are decided on the spot and keep cascading forward.
+    """
+    graph = get_graph(bracket)
+    match = graph.get(match_id)
+    if not match or not winner or winner not in (match['p1'], match['p2']):
+        return bracket
+
+    pending = [(match, winner)]
+    while pending:
+        m, m_winner = pending.pop()
+        graph.set_result(m, m_winner, m['p2'] if m_winner == m['p1'] else m['p1'])
+
+        for target_id in _advance_from(bracket, m, graph):
+            auto_winner = _bye_winner(graph, target_id)
+            if auto_winner:
+                pending.append((graph.ensure(target_id), auto_winner))
 
-    # --- LINKING LOGIC (The Fix is Here) ---
-    _link_brackets(bracket)
-    
     return bracket
 
-def _link_brackets(bracket):
-    w_rounds = bracket['winners']
-    l_rounds = bracket['losers']
-    
-    # 1. LINK WINNERS BRACKET
-    for r_idx, rounds in enumerate(w_rounds):
-        for m_idx, match in enumerate(rounds):
-            # Advance Winner
-            if r_idx < len(w_rounds) - 1:
-                match['next_w'] = f"W{r_idx+2}-{m_idx//2+1}"
-            else:
-                match['next_w'] = "F1-1"
-            
-            # --- LOSER DROP LOGIC ---
-            # Determine which round in Losers Bracket to target
-            if r_idx == 0:
-                l_target_round = 0 # W1 losers -> L1
-            else:
-                l_target_round = (r_idx * 2) - 1 # W2->L2, W3->L4
-            
-            if l_target_round < len(l_rounds):
-                # FIXED MAPPING LOGIC:
-                # In W Round 1, TWO W-matches feed ONE L-match.
-                # W-Match 0 & 1 -> L-Match 0
-                # W-Match 2 & 3 -> L-Match 1
-                if r_idx == 0:
-                    target_match_idx = m_idx // 2
-                else:
-                    # In later rounds, it's often 1-to-1 mapping
-                    target_match_idx = m_idx
-                
-                # Safety check
-                if target_match_idx < len(l_rounds[l_target_round]):
-                    match['next_l'] = f"L{l_target_round+1}-{target_match_idx+1}"
-
-    # 2. LINK LOSERS BRACKET
-    for r_idx, rounds in enumerate(l_rounds):
-        for m_idx, match in enumerate(rounds):
-            if r_idx < len(l_rounds) - 1:
-                is_even_round = ((r_idx + 1) % 2 == 0)
-                if is_even_round:
-                    # L2->L3 (Compression Round: 2 matches -> 1 match)
-                    match['next_w'] = f"L{r_idx+2}-{m_idx//2+1}"
-                else:
-                    # L1->L2 (Direct Round: 2 matches -> 2 matches)
-                    match['next_w'] = f"L{r_idx+2}-{m_idx+1}"
-            else:
-                match['next_w'] = "F1-1"
+def check_result(bracket, match_id, winner):
+    """Why this result can't be recorded right now, or None if it can"""
+    graph = get_graph(bracket)
+    m = graph.get(match_id)
+    if not m: return f"{match_id}: no such match (yet)"
+    if m['winner']: return f"{match_id}: already decided, {m['winner']} won"
+    # A lone player whose opponent can only ever be a BYE (e.g. after undoing an automatic win)
+    if not (m['p1'] and m['p2']) and _bye_winner(graph, match_id) != winner:
+        return f"{match_id}: still waiting for a player"
+    if winner not in (m['p1'], m['p2']): return f"{match_id}: {winner} is not playing in it"
+    return None
+
+def is_automatic(match):
+    """
+    True for a match no real player is in: its BYE result comes from the
+    cascade, and nothing would decide it again after an undo.
+    """
+    return not any(p and p != "BYE" for p in (match['p1'], match['p2']))
+
+@perf.timed('logic.record_results')
+def record_results(bracket, results):
+    """
+    Records [(match_id, winner), ...] in order, so a result may depend on an
+    earlier one in the same batch. Invalid entries are skipped. Returns the
+    error messages (empty when everything went in).
+    """
+    errors = []
+    for match_id, winner in results:
+        error = check_result(bracket, match_id, winner)
+        if error:
+            errors.append(error)
+        else:
+            record_result(bracket, match_id, winner)
+    return errors
+
+def _advance_from(bracket, m, graph):
+    """Moves one decided match's winner and loser forward. Returns the target ids."""
+    targets = []
+    prefer_p1 = not m['id'].startswith('L')
+
+    if m.get('next_w'):
+        _fill_slot(bracket, m['next_w'], m['winner'], prefer_p1, graph=graph)
+        targets.append(m['next_w'])
+
+    if m.get('next_l'):
+        if m['loser'] and m['loser'] != "BYE":
+            _fill_slot(bracket, m['next_l'], m['loser'], prefer_p1=True, graph=graph)
+        targets.append(m['next_l'])
+
+    return targets
+
+def _bye_winner(graph, match_id):
+    """The player who takes an undecided match by default, or None if it must be played"""
+    m = graph.get(match_id)
+    p1, p2 = (m['p1'], m['p2']) if m else (None, None)
+    if m and m['winner']: return None
+
+    if p1 and p2:
+        if p2 == "BYE": return p1
+        if p1 == "BYE": return p2
+        return None
 
+    # Open slots only count as BYEs once every feeder is done (a dropped BYE
+    # never arrives). A match nobody can reach passes a BYE forward itself.
+    feeders = graph.feeders_of(match_id)
+    if not feeders: return None
+    for feeder_id in feeders:
+        feeder = graph.get(feeder_id)
+        if not feeder or not feeder['winner']:
+            return None
+    return p1 or p2 or "BYE"
+
+@perf.timed('logic.advance_bracket')
 def advance_bracket(bracket):
+    """
+    Full re-walk of every decided match. record_result is the normal path;
+    this stays around to repair or verify a bracket loaded from elsewhere.
+    """
+    graph = get_graph(bracket)
     all_rounds = bracket['winners'] + bracket['losers'] + bracket['finals']
     
     for round_matches in all_rounds:
@@ -133,49 +351,38 @@ def advance_bracket(bracket):
                 if m['id'].startswith('L'): prefer_p1 = False
                 if m['id'].startswith('W'): prefer_p1 = True
 
-                _fill_slot(bracket, m['next_w'], m['winner'], prefer_p1)
+                _fill_slot(bracket, m['next_w'], m['winner'], prefer_p1, graph=graph)
                 
                 # Move Loser
                 if m.get('next_l') and m['loser'] and m['loser'] != "BYE":
-                    _fill_slot(bracket, m['next_l'], m['loser'], prefer_p1=True)
+                    _fill_slot(bracket, m['next_l'], m['loser'], prefer_p1=True, graph=graph)
 
     # Secondary Pass for internal L-bracket movement
     for round_matches in bracket['losers']:
         for m in round_matches:
             if m['winner']:
-                 _fill_slot(bracket, m['next_w'], m['winner'], prefer_p1=False)
+                 _fill_slot(bracket, m['next_w'], m['winner'], prefer_p1=False, graph=graph)
 
     return bracket
 
-def _fill_slot(bracket, target_id, player_name, prefer_p1=None):
+def _fill_slot(bracket, target_id, player_name, prefer_p1=None, graph=None):
     if not target_id: return 
 
-    target_match = None
-    all_rounds = bracket['winners'] + bracket['losers'] + bracket['finals']
-    
-    for rounds in all_rounds:
-        for m in rounds:
-            if m['id'] == target_id:
-                target_match = m
-                break
-        if target_match: break
-    
-    if not target_match: return
+    graph = graph or get_graph(bracket)
+    target_match = graph.ensure(target_id)
 
     # Avoid adding duplicates if the player is already there
     if target_match['p1'] == player_name or target_match['p2'] == player_name:
         return
 
     # Slotting Logic
-    if prefer_p1 is True:
-        if target_match['p1'] is None: target_match['p1'] = player_name
-        elif target_match['p2'] is None: target_match['p2'] = player_name
-    elif prefer_p1 is False:
-        if target_match['p2'] is None: target_match['p2'] = player_name
-        elif target_match['p1'] is None: target_match['p1'] = player_name
-    else:
-        if target_match['p1'] is None: target_match['p1'] = player_name
-        elif target_match['p2'] is None: target_match['p2'] = player_name
+    order = ('p2', 'p1') if prefer_p1 is False else ('p1', 'p2')
+    for slot in order:
+        if target_match[slot] is None:
+            graph.set_slot(target_match, slot, player_name)
+            break
+
+@perf.timed('logic.undo_match')
 def undo_match(bracket, match_id):
     """
     Reverts a match result. 
@@ -193,12 +400,14 @@ def undo_match(bracket, match_id):
         _remove_player_from_match(bracket, match['next_w'], winner)
     
     # 2. Recursively clean the Loser's path (if they dropped)
-    if match.get('next_l') and loser != "BYE":
+    if match.get('next_l') and loser and loser != "BYE":
         _remove_player_from_match(bracket, match['next_l'], loser)
 
     # 3. Reset the current match
-    match['winner'] = None
-    match['loser'] = None
+    graph = get_graph(bracket)
+    graph.set_result(match, None, None)
+    if not match['p1'] and not match['p2']:
+        graph.discard(match_id)
     
     return bracket
 
@@ -208,20 +417,80 @@ def _remove_player_from_match(bracket, match_id, player_name):
     if not target: return
 
     # RECURSION SAFETY: 
-    # If the player we are removing has ALREADY won this future match,
-    # we must undo this match first to prevent a "ghost winner".
-    if target['winner'] == player_name:
+    # If the player we are removing has ALREADY played this future match,
+    # we must undo it first: a win leaves a "ghost winner" downstream, a
+    # loss a ghost loser in the losers bracket.
+    if target['winner'] and player_name in (target['p1'], target['p2']):
         undo_match(bracket, target['id'])
 
     # Remove the player from the slot
-    if target['p1'] == player_name: target['p1'] = None
-    if target['p2'] == player_name: target['p2'] = None
+    graph = get_graph(bracket)
+    for slot in ('p1', 'p2'):
+        if target[slot] == player_name: graph.set_slot(target, slot, None)
+
+    # Keep only populated matches around
+    if not target['p1'] and not target['p2'] and not target['winner']:
+        get_graph(bracket).discard(match_id)
 
 def _find_match_by_id(bracket, match_id):
     """Helper to find a match dict anywhere in the bracket"""
-    all_rounds = bracket['winners'] + bracket['losers'] + bracket['finals']
-    for rounds in all_rounds:
-        for m in rounds:
-            if m['id'] == match_id:
-                return m
-    return None
\ No newline at end of file
+    return get_graph(bracket).get(match_id)
+
+def rename_player(bracket, old_name, new_name):
+    """
+    Renames a player in place, touching only the matches they appear in.
+    Returns the ids of the rewritten matches. Raises ValueError if new_name
+    is already in this bracket.
+    """
+    graph = get_graph(bracket)
+    if new_name in graph.occurrences:
+        raise ValueError(f"{new_name} is already in this bracket")
+
+    match_ids = graph.occurrences.pop(old_name, set())
+    for match_id in match_ids:
+        m = graph.matches[match_id]
+        for key in ('p1', 'p2', 'winner', 'loser'):
+            if m[key] == old_name: m[key] = new_name
+    if match_ids:
+        graph.occurrences[new_name] = match_ids
+    return sorted(match_ids)
+
+# --- JOURNAL ---
+# Captures the before/after state of every match an action touches, so the
+# action can later be reverted or replayed in time proportional to its size.
+def match_state(match):
+    """(p1, p2, winner, loser), or None for a match record that does not exist"""
+    if match is None: return None
+    return (match['p1'], match['p2'], match['winner'], match['loser'])
+
+def start_journal(bracket):
+    get_graph(bracket).journal = {}
+
+def take_journal(bracket):
+    """Closes the journal. Returns the delta [[match_id, before, after], ...] of what changed."""
+    graph = get_graph(bracket)
+    journal, graph.journal = graph.journal or {}, None
+    delta = []
+    for match_id, before in journal.items():
+        after = match_state(graph.get(match_id))
+        if after != before:
+            delta.append([match_id, before, after])
+    return delta
+
+def apply_delta(bracket, delta, reverse=False):
+    """Moves the bracket to the after states of a delta (or back to the before states)"""
+    graph = get_graph(bracket)
+    for match_id, before, after in delta:
+        state = before if reverse else after
+        if state is None:
+            m = graph.get(match_id)
+            if m:
+                graph.set_slot(m, 'p1', None)
+                graph.set_slot(m, 'p2', None)
+                graph.discard(match_id)
+            continue
+        m = graph.ensure(match_id)
+        graph.set_slot(m, 'p1', state[0])
+        graph.set_slot(m, 'p2', state[1])
+        graph.set_result(m, state[2], state[3])
+    return bracket
@@ -0,0 +1,90 @@
+import threading
+import numpy as np
+import database as db
+
+# Pairwise records from match_history, indexed by the players table rowid.
+# Stored sparse: one sorted int64 key (winner index * STRIDE + loser index)
+# per pair that has met, so single and batch lookups are a searchsorted.
+# Rebuilt only when the 'history' data version moves (i.e. on archive).
+STRIDE = 1 << 32
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+class HeadToHead:
+    def __init__(self, index, winner_idx, loser_idx, wins):
+        self.index = index
+        keys = winner_idx.astype(np.int64) * STRIDE + loser_idx.astype(np.int64)
+        order = np.argsort(keys)
+        self.keys = keys[order]
+        self.wins = wins[order]
+        # Plain dict for one-off lookups, where numpy call overhead would dominate
+        self.pairs = dict(zip(self.keys.tolist(), self.wins.tolist()))
+
+    def _wins(self, winner_idx, loser_idx):
+        keys = np.asarray(winner_idx, dtype=np.int64) * STRIDE + np.asarray(loser_idx, dtype=np.int64)
+        if len(self.keys) == 0:
+            return np.zeros(keys.shape, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[pos] == keys, self.wins[pos], 0)
+
+    def record(self, name_a, name_b):
+        """(wins of a over b, wins of b over a)"""
+        a, b = self.index.get(name_a), self.index.get(name_b)
+        if a is None or b is None:
+            return 0, 0
+        return self.pairs.get(a * STRIDE + b, 0), self.pairs.get(b * STRIDE + a, 0)
+
+    def batch(self, pairs):
+        """Array of [a wins, b wins] rows for a list of (name_a, name_b) pairs"""
+        if not pairs:
+            return np.zeros((0, 2), dtype=np.int64)
+        # -1 never matches a key, so unknown names come back 0-0
+        a = np.array([self.index.get(p[0], -1) for p in pairs], dtype=np.int64)
+        b = np.array([self.index.get(p[1], -1) for p in pairs], dtype=np.int64)
+        return np.stack([self._wins(a, b), self._wins(b, a)], axis=1)
+
+def build():
+    """Aggregates the whole archive into a HeadToHead"""
+    with db.get_connection() as conn:
+        index = {name: rowid for rowid, name in conn.execute('SELECT rowid, name FROM players')}
+        rows = conn.execute('''SELECT winner, CASE WHEN winner = p1 THEN p2 ELSE p1 END, COUNT(*)
+                               FROM match_history WHERE p1 != 'BYE' AND p2 != 'BYE'
+                               GROUP BY 1, 2''').fetchall()
+
+    # History can mention names no longer on the roster; give them spare indices
+    next_idx = max(index.values(), default=0) + 1
+    for winner, loser, _ in rows:
+        for name in (winner, loser):
+            if name not in index:
+                index[name] = next_idx
+                next_idx += 1
+
+    winner_idx = np.array([index[r[0]] for r in rows], dtype=np.int64)
+    loser_idx = np.array([index[r[1]] for r in rows], dtype=np.int64)
+    wins = np.array([r[2] for r in rows], dtype=np.int64)
+    return HeadToHead(index, winner_idx, loser_idx, wins)
+
+def get_head_to_head():
+    """Process-wide HeadToHead, rebuilt only after new tournaments are archived"""
+    version = db.get_data_version('history')
+    cached = _cache.get('h2h')
+    if cached and cached[0] == version:
+        return cached[1]
+    with _cache_lock:
+        cached = _cache.get('h2h')
+        if not cached or cached[0] != version:
+            cached = (version, build())
+            _cache['h2h'] = cached
+    return cached[1]
+
+def bracket_records(bracket):
+    """(p1, p2) -> (p1 wins, p2 wins) for every card with two real players"""
+    pairs = []
+    for section in ('winners', 'losers', 'finals'):
+        for rounds in bracket.get(section, []):
+            for m in rounds:
+                if m['p1'] and m['p2'] and "BYE" not in (m['p1'], m['p2']):
+                    pairs.append((m['p1'], m['p2']))
+    records = get_head_to_head().batch(pairs)
+    return {pair: (int(a), int(b)) for pair, (a, b) in zip(pairs, records.tolist())}
@@ -2,8 +2,7 @@ import streamlit as st
 import database as db
 import styles
 import auth
-import view_bracket
-import view_manager
+import perf
 
 # 1. Setup
 st.set_page_config(page_title="Air Hockey Bracket", layout="wide")
@@ -17,14 +16,42 @@ st.sidebar.title("🏒 Navigation")
 # We use a key='nav_mode' so Streamlit remembers this selection perfectly
 view_mode = st.sidebar.radio(
     "Select Mode:", 
-    ["👀 Spectator View", "🔧 Manager Portal"],
+    ["👀 Spectator View", "📋 Call Board", "📊 Leaderboard", "🔧 Manager Portal"],
     key="nav_mode"
 )
+perf.begin_run(view_mode)
+
+# Several tournaments (e.g. junior and open divisions) can run side by side
+tournaments = dict(db.list_tournaments())
+if "pending_tournament_id" in st.session_state:
+    st.session_state.tournament_id = st.session_state.pop("pending_tournament_id")
+if st.session_state.get("tournament_id") not in tournaments:
+    st.session_state.pop("tournament_id", None)
+
+tournament_id = None
+if tournaments:
+    tournament_id = st.sidebar.selectbox(
+        "Tournament:",
+        list(tournaments),
+        format_func=tournaments.get,
+        key="tournament_id"
+    )
 
 # 3. Routing
+# Page modules are imported by the route that needs them (the first visit
+# pays for it, numpy included; later reruns hit sys.modules)
 if view_mode == "👀 Spectator View":
     # --- SPECTATOR MODE ---
-    view_bracket.render_bracket(is_manager=False)
+    import view_bracket
+    view_bracket.render_bracket(tournament_id, is_manager=False)
+
+elif view_mode == "📋 Call Board":
+    import view_callboard
+    view_callboard.render_call_board(tournament_id)
+
+elif view_mode == "📊 Leaderboard":
+    import view_leaderboard
+    view_leaderboard.render_leaderboard()
 
 elif view_mode == "🔧 Manager Portal":
     # --- MANAGER MODE ---
@@ -33,6 +60,8 @@ elif view_mode == "🔧 Manager Portal":
     auth.login_form()
     
     if auth.check_password():
+        import view_bracket
+        import view_manager
         st.sidebar.divider()
         st.sidebar.markdown("### Manager Tools")
         
@@ -40,14 +69,21 @@ elif view_mode == "🔧 Manager Portal":
         # This keeps you on the same page after clicking "Win"
         manager_task = st.sidebar.radio(
             "Go to:", 
-            ["🏆 Live Bracket", "🔧 Player Setup"],
+            ["🏆 Live Bracket", "📋 Call Board", "🔧 Player Setup"],
             key="manager_nav"
         )
+        view_manager.render_perf_panel()
         
         if manager_task == "🏆 Live Bracket":
-            view_bracket.render_bracket(is_manager=True)
+            view_bracket.render_bracket(tournament_id, is_manager=True)
             
+        elif manager_task == "📋 Call Board":
+            import view_callboard
+            view_callboard.render_call_board(tournament_id, is_manager=True)
+
         elif manager_task == "🔧 Player Setup":
-            view_manager.render_setup_tab()
+            view_manager.render_setup_tab(tournament_id)
     else:
-        st.info("Please log in via the sidebar to access Manager Tools.")
\ No newline at end of file
+        st.info("Please log in via the sidebar to access Manager Tools.")
+
+perf.end_run()
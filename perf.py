@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+
+# Lightweight per-rerun timings and counters. Everything is a no-op behind
+# one global flag, so hooks can stay in the hot paths for good. Each script
+# run (one Streamlit rerun) collects into a thread-local record that lands
+# in a shared ring buffer when the run ends. No Streamlit in here.
+ENABLED = os.environ.get("BRACKET_PERF") == "1"
+HISTORY_SIZE = 200
+
+_history = deque(maxlen=HISTORY_SIZE)
+_history_lock = threading.Lock()
+_local = threading.local()
+_NULL = nullcontext()
+
+def set_enabled(enabled):
+    global ENABLED
+    ENABLED = bool(enabled)
+
+def begin_run(label=""):
+    """Starts collecting for the current script run"""
+    # A run cut short by st.rerun() never reached end_run(); file it now
+    end_run()
+    if not ENABLED:
+        _local.run = None
+        return
+    _local.run = {"label": label, "started": time.time(), "_t0": time.perf_counter(),
+                  "timings": {}, "counters": {}}
+    _local.active = set()
+
+def end_run():
+    """Closes the current run and files it in the ring buffer"""
+    run = getattr(_local, "run", None)
+    _local.run = None
+    if run is None:
+        return
+    run["total"] = time.perf_counter() - run.pop("_t0")
+    with _history_lock:
+        _history.append(run)
+
+def count(name, n=1):
+    """Adds n to a counter of the current run (DB calls, bytes, elements...)"""
+    if ENABLED:
+        run = getattr(_local, "run", None)
+        if run is not None:
+            run["counters"][name] = run["counters"].get(name, 0) + n
+
+class _Span:
+    __slots__ = ("name", "start", "nested")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        active = _local.active
+        # Recursive calls (undo_match) count once, at the outermost level
+        self.nested = self.name in active
+        active.add(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.nested:
+            return False
+        elapsed = time.perf_counter() - self.start
+        _local.active.discard(self.name)
+        run = getattr(_local, "run", None)
+        if run is not None:
+            entry = run["timings"].setdefault(self.name, [0.0, 0])
+            entry[0] += elapsed
+            entry[1] += 1
+        return False
+
+def span(name):
+    """with perf.span("layer.step"): ...  -- times the block into the current run"""
+    if ENABLED and getattr(_local, "run", None) is not None:
+        return _Span(name)
+    return _NULL
+
+def timed(name=None):
+    """Decorator form of span(); the name defaults to module.function"""
+    def decorator(fn):
+        label = name or f"{fn.__module__}.{fn.__name__}"
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# --- READING / EXPORT ---
+def history():
+    """Finished runs, oldest first"""
+    with _history_lock:
+        return list(_history)
+
+def clear():
+    with _history_lock:
+        _history.clear()
+
+def summary(runs=None):
+    """Per timing name: (calls, total seconds, mean ms per run) over the given runs"""
+    runs = history() if runs is None else runs
+    totals = {}
+    for run in runs:
+        for name, (seconds, calls) in run["timings"].items():
+            entry = totals.setdefault(name, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+    n = max(len(runs), 1)
+    return {name: (calls, seconds, seconds * 1000 / n) for name, (calls, seconds) in totals.items()}
+
+def export_json(runs=None):
+    runs = history() if runs is None else runs
+    return json.dumps(runs, indent=2)
+
+def export_csv(runs=None):
+    """One row per (run, metric): started, label, run total, kind, name, value, calls"""
+    runs = history() if runs is None else runs
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["started", "label", "run_seconds", "kind", "name", "value", "calls"])
+    for run in runs:
+        head = [run["started"], run["label"], round(run["total"], 6)]
+        for name, (seconds, calls) in run["timings"].items():
+            writer.writerow(head + ["timing", name, round(seconds, 6), calls])
+        for name, value in run["counters"].items():
+            writer.writerow(head + ["counter", name, value, ""])
+    return out.getvalue()
@@ -0,0 +1,100 @@
+import threading
+import numpy as np
+import database as db
+
+# Elo ratings over match_history. Each archived tournament is one rating
+# period: every game in it is scored against the ratings at the start of
+# the tournament, which lets a whole period update in a few array ops.
+BASE_RATING = 1500.0
+K_FACTOR = 32.0
+SCALE = 400.0
+
+_update_lock = threading.Lock()
+
+def load_history(conn, unrated_only=False):
+    """
+    Real (non-BYE) history games as arrays, in tournament order:
+    names, p1 index, p2 index, p1 won (0/1), period index, timestamps, tournament ids
+    """
+    query = '''SELECT tournament_id, timestamp, p1, p2, winner FROM match_history
+               WHERE p1 != 'BYE' AND p2 != 'BYE' '''
+    if unrated_only:
+        query += 'AND tournament_id NOT IN (SELECT tournament_id FROM rated_tournaments) '
+    query += 'ORDER BY timestamp, tournament_id'
+    rows = conn.execute(query).fetchall()
+
+    if not rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return np.zeros(0, dtype=object), empty, empty, np.zeros(0), empty, np.zeros(0, dtype=object), np.zeros(0, dtype=object)
+
+    tournament_ids, timestamps, p1, p2, winner = (np.array(col, dtype=object) for col in zip(*rows))
+    names, inverse = np.unique(np.concatenate([p1, p2]).astype(str), return_inverse=True)
+    p1_idx, p2_idx = inverse[:len(rows)], inverse[len(rows):]
+    p1_won = (winner == p1).astype(np.float64)
+
+    # Periods numbered by when each tournament first shows up
+    _, first_seen, period = np.unique(tournament_ids.astype(str), return_index=True, return_inverse=True)
+    period = np.argsort(np.argsort(first_seen))[period]
+    return names, p1_idx, p2_idx, p1_won, period, timestamps, tournament_ids
+
+def replay(p1_idx, p2_idx, p1_won, period, ratings):
+    """Runs the games period by period. Returns (new ratings, games played per player)."""
+    ratings = np.array(ratings, dtype=np.float64)
+    games = np.zeros(len(ratings), dtype=np.int64)
+    if len(p1_idx) == 0:
+        return ratings, games
+
+    order = np.argsort(period, kind='stable')
+    p1_idx, p2_idx, p1_won, period = p1_idx[order], p2_idx[order], p1_won[order], period[order]
+
+    bounds = np.flatnonzero(np.diff(period)) + 1
+    for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(period)]):
+        a, b = p1_idx[start:stop], p2_idx[start:stop]
+        expected = 1.0 / (1.0 + 10.0 ** ((ratings[b] - ratings[a]) / SCALE))
+        delta = K_FACTOR * (p1_won[start:stop] - expected)
+        np.add.at(ratings, a, delta)
+        np.add.at(ratings, b, -delta)
+
+    np.add.at(games, p1_idx, 1)
+    np.add.at(games, p2_idx, 1)
+    return ratings, games
+
+def rebuild_ratings():
+    """Full recompute from the whole archive (repair / first run)"""
+    with _update_lock, db.transaction() as conn:
+        names, p1_idx, p2_idx, p1_won, period, _, tournament_ids = load_history(conn)
+        ratings, games = replay(p1_idx, p2_idx, p1_won, period, np.full(len(names), BASE_RATING))
+
+        conn.execute('DELETE FROM player_ratings')
+        conn.execute('DELETE FROM rated_tournaments')
+        conn.executemany('INSERT INTO player_ratings (name, rating, games) VALUES (?, ?, ?)',
+                         zip(names.tolist(), ratings.tolist(), games.tolist()))
+        conn.executemany('INSERT OR IGNORE INTO rated_tournaments (tournament_id) VALUES (?)',
+                         [(t,) for t in set(tournament_ids.tolist())])
+    return len(names)
+
+def update_ratings():
+    """Applies only the archived tournaments that are not rated yet. Returns how many games it used."""
+    with _update_lock, db.transaction() as conn:
+        names, p1_idx, p2_idx, p1_won, period, _, tournament_ids = load_history(conn, unrated_only=True)
+        if len(names) == 0:
+            return 0
+
+        current = dict(conn.execute('SELECT name, rating FROM player_ratings'))
+        start = np.array([current.get(name, BASE_RATING) for name in names.tolist()])
+        ratings, games = replay(p1_idx, p2_idx, p1_won, period, start)
+
+        conn.executemany('''INSERT INTO player_ratings (name, rating, games) VALUES (?, ?, ?)
+                            ON CONFLICT(name) DO UPDATE SET rating = excluded.rating, games = games + excluded.games''',
+                         zip(names.tolist(), ratings.tolist(), games.tolist()))
+        conn.executemany('INSERT OR IGNORE INTO rated_tournaments (tournament_id) VALUES (?)',
+                         [(t,) for t in set(tournament_ids.tolist())])
+    return len(p1_idx)
+
+def get_ratings(names=None):
+    """name -> rating from the persisted table; unknown players get BASE_RATING"""
+    with db.get_connection() as conn:
+        stored = dict(conn.execute('SELECT name, rating FROM player_ratings'))
+    if names is None:
+        return stored
+    return {name: stored.get(name, BASE_RATING) for name in names}
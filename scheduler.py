@@ -0,0 +1,145 @@
+import heapq
+import random
+import time
+from functools import lru_cache
+import database as db
+import game_logic as gl
+
+# Table/court scheduling. Ready matches (MatchGraph.ready, maintained by
+# game_logic on every write) are called to free tables in critical-path
+# order: the match with the longest chain of matches still hanging off it
+# goes first, so the losers bracket (and with it the grand final) is not
+# starved. Players who just finished get a short rest when other matches
+# could fill the table instead. refresh_calls() is a write, so it runs when
+# results change and from the manager's board, never from spectator screens.
+DEFAULT_TABLES = 4
+REST_SECONDS = 120
+
+@lru_cache(maxsize=None)
+def remaining_path(match_id, total_players):
+    """Matches on the longest chain from this one to the end of the event, itself included"""
+    next_w, next_l = gl.next_match_ids(match_id, total_players)
+    return 1 + max((remaining_path(t, total_players) for t in (next_w, next_l) if t), default=0)
+
+def priority(match_id, total_players):
+    """Sort key: critical path first, then earlier rounds, then bracket order"""
+    prefix, round_no, idx = gl.parse_match_id(match_id)
+    return (-remaining_path(match_id, total_players), round_no, "WLF".index(prefix), idx)
+
+def ready_queue(bracket):
+    """Ids of the matches playable right now, most urgent first"""
+    graph = gl.get_graph(bracket)
+    return sorted(graph.ready, key=lambda match_id: priority(match_id, graph.total_players))
+
+# --- TABLE CALLS ---
+def get_table_count(tournament_id):
+    with db.get_connection() as conn:
+        row = conn.execute('SELECT table_count FROM tournaments WHERE id = ?', (tournament_id,)).fetchone()
+    return row[0] if row else DEFAULT_TABLES
+
+def set_table_count(tournament_id, table_count):
+    with db.transaction() as conn:
+        conn.execute('UPDATE tournaments SET table_count = ? WHERE id = ?', (table_count, tournament_id))
+
+def refresh_calls(tournament_id, bracket, now=None):
+    """
+    Brings the call board in line with the bracket: closes calls whose match
+    has a result, drops calls an undo made unplayable, and calls the most
+    urgent ready matches to free tables. Returns get_calls().
+    """
+    graph = gl.get_graph(bracket)
+    now = now or time.time()
+    with db.transaction() as conn:
+        active = conn.execute('''SELECT match_id, table_no FROM table_calls
+                                 WHERE tournament_id = ? AND finished_at IS NULL''', (tournament_id,)).fetchall()
+        finished = [(now, tournament_id, match_id) for match_id, _ in active
+                    if graph.get(match_id) and graph.get(match_id)['winner']]
+        cancelled = [(tournament_id, match_id) for match_id, _ in active
+                     if match_id not in graph.ready and not (graph.get(match_id) and graph.get(match_id)['winner'])]
+        conn.executemany('''UPDATE table_calls SET finished_at = ?
+                            WHERE tournament_id = ? AND match_id = ? AND finished_at IS NULL''', finished)
+        conn.executemany('''DELETE FROM table_calls
+                            WHERE tournament_id = ? AND match_id = ? AND finished_at IS NULL''', cancelled)
+
+        playing = {match_id: table_no for match_id, table_no in active if match_id in graph.ready}
+        table_count = conn.execute('SELECT table_count FROM tournaments WHERE id = ?',
+                                   (tournament_id,)).fetchone()[0]
+        free = [t for t in range(1, table_count + 1) if t not in playing.values()]
+        queue = [match_id for match_id in ready_queue(bracket) if match_id not in playing]
+
+        if free and queue:
+            resting = set()
+            for p1, p2 in conn.execute('''SELECT p1, p2 FROM table_calls
+                                          WHERE tournament_id = ? AND finished_at >= ?''',
+                                       (tournament_id, now - REST_SECONDS)):
+                resting.update((p1, p2))
+            # Rested players first; a tired pair still beats an idle table
+            queue.sort(key=lambda match_id: bool(resting & {graph.get(match_id)['p1'], graph.get(match_id)['p2']}))
+            conn.executemany('''INSERT OR IGNORE INTO table_calls
+                                (tournament_id, match_id, table_no, p1, p2, called_at)
+                                VALUES (?, ?, ?, ?, ?, ?)''',
+                             [(tournament_id, match_id, table_no, graph.get(match_id)['p1'],
+                               graph.get(match_id)['p2'], now) for table_no, match_id in zip(free, queue)])
+    return get_calls(tournament_id)
+
+def get_calls(tournament_id):
+    """Current calls, by table: [(table_no, match_id, p1, p2, called_at)]"""
+    with db.get_connection() as conn:
+        cursor = conn.execute('''SELECT table_no, match_id, p1, p2, called_at FROM table_calls
+                                 WHERE tournament_id = ? AND finished_at IS NULL ORDER BY table_no''',
+                              (tournament_id,))
+        return cursor.fetchall()
+
+def call_stats(tournament_id):
+    """(finished matches, mean minutes per match, minutes since the first call)"""
+    with db.get_connection() as conn:
+        row = conn.execute('''SELECT COUNT(finished_at), AVG(finished_at - called_at), MIN(called_at)
+                              FROM table_calls WHERE tournament_id = ?''', (tournament_id,)).fetchone()
+    finished, mean_seconds, first_call = row
+    elapsed = (time.time() - first_call) / 60 if first_call else 0.0
+    return finished, (mean_seconds or 0.0) / 60, elapsed
+
+# --- WHAT-IF ---
+def simulate_event(n_players, tables, policy="critical", mean_minutes=8.0, seed=None):
+    """
+    Plays a whole random event on `tables` tables with exponential match
+    lengths and returns the total minutes. policy "critical" uses the call
+    board order, "fifo" calls matches in the order they became ready.
+    """
+    rng = random.Random(seed)
+    state = random.getstate()
+    random.seed(seed)
+    bracket = gl.generate_bracket([f"P{i}" for i in range(n_players)])
+    random.setstate(state)
+    graph = gl.get_graph(bracket)
+
+    # BYE matches need no table
+    for m in list(bracket['winners'][0]):
+        if "BYE" in (m['p1'], m['p2']):
+            gl.record_result(bracket, m['id'], m['p2'] if m['p1'] == "BYE" else m['p1'])
+
+    became_ready, order = {}, 0
+    def note_ready():
+        nonlocal order
+        for match_id in graph.ready:
+            if match_id not in became_ready:
+                became_ready[match_id] = order
+                order += 1
+
+    clock, free, running = 0.0, tables, []
+    while True:
+        note_ready()
+        waiting = [match_id for match_id in graph.ready if match_id not in {r[1] for r in running}]
+        if policy == "fifo":
+            waiting.sort(key=became_ready.get)
+        else:
+            waiting.sort(key=lambda match_id: priority(match_id, graph.total_players))
+        for match_id in waiting[:free]:
+            heapq.heappush(running, (clock + rng.expovariate(1 / mean_minutes), match_id))
+            free -= 1
+        if not running:
+            return clock
+        clock, match_id = heapq.heappop(running)
+        free += 1
+        m = graph.get(match_id)
+        gl.record_result(bracket, match_id, rng.choice([m['p1'], m['p2']]))
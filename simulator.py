@@ -0,0 +1,158 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import database as db
+import game_logic as gl
+import ratings
+
+# Monte Carlo play-out of the rest of a live bracket. Every undecided match
+# is simulated for a whole chunk of runs at once (one array op per match),
+# walking the same next_w/next_l topology game_logic uses. BYEs and empty
+# slots are index -1 and lose to anyone, like record_result's BYE cascade.
+DEFAULT_SIMS = 100_000
+CHUNK_SIZE = 20_000
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def build_plan(bracket, strengths=None):
+    """
+    Flattens the bracket into a picklable plan: players, their ratings and
+    per match (source 1, source 2, fixed winner, fixed loser, round index) in
+    play order. A source is ('fixed', player) or ('win'|'lose', match index).
+    """
+    graph = gl.get_graph(bracket)
+    total = graph.total_players
+    w_count, l_count = gl.round_counts(total)
+
+    rounds = [f"W{r}" for r in range(1, w_count + 1)] + [f"L{r}" for r in range(1, l_count + 1)] + ["F1"]
+    round_index = {label: i for i, label in enumerate(rounds)}
+
+    players = sorted({name for m in graph.matches.values() for name in (m['p1'], m['p2'])
+                      if name and name != "BYE"})
+    player_index = {name: i for i, name in enumerate(players)}
+    if strengths is None:
+        strengths = ratings.get_ratings(players)
+    rating = np.array([strengths.get(name, ratings.BASE_RATING) for name in players], dtype=np.float64)
+
+    def idx(name):
+        return player_index.get(name, -1)
+
+    # Feeders always sit earlier in the bracket, so a DFS from the final gives play order
+    order, position = [], {}
+    def visit(match_id):
+        if match_id in position: return
+        for feeder_id in gl.feeder_match_ids(match_id, total):
+            visit(feeder_id)
+        position[match_id] = len(order)
+        order.append(match_id)
+    visit("F1-1")
+
+    matches = []
+    for match_id in order:
+        m = graph.get(match_id)
+        prefix, r, _ = gl.parse_match_id(match_id)
+        if m and m['winner']:
+            sources = [('fixed', idx(m['p1'])), ('fixed', idx(m['p2']))]
+            fixed = (idx(m['winner']), idx(m['loser']))
+        elif prefix == "W" and r == 1:
+            sources = [('fixed', idx(m['p1'] if m else None)), ('fixed', idx(m['p2'] if m else None))]
+            fixed = (None, None)
+        else:
+            sources = []
+            for feeder_id in gl.feeder_match_ids(match_id, total):
+                kind = 'win' if gl.next_match_ids(feeder_id, total)[0] == match_id else 'lose'
+                sources.append((kind, position[feeder_id]))
+            while len(sources) < 2:
+                sources.append(('fixed', -1))
+            fixed = (None, None)
+        matches.append((sources[0], sources[1], fixed[0], fixed[1], round_index[f"{prefix}{r}"]))
+
+    return {"players": players, "rating": rating, "rounds": rounds, "matches": matches}
+
+def _simulate_counts(plan, n_sims, seed):
+    """Runs n_sims play-outs. Returns (reach counts [round, player], title counts [player])."""
+    rng = np.random.default_rng(seed)
+    rating = plan['rating']
+    n_players = len(plan['players'])
+    reach = np.zeros((len(plan['rounds']), n_players), dtype=np.int64)
+    titles = np.zeros(n_players, dtype=np.int64)
+
+    for start in range(0, n_sims, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, n_sims - start)
+        winners, losers = [], []
+
+        def source(src):
+            kind, value = src
+            if kind == 'fixed': return np.full(size, value, dtype=np.int64)
+            return winners[value] if kind == 'win' else losers[value]
+
+        for src1, src2, fixed_w, fixed_l, round_idx in plan['matches']:
+            a, b = source(src1), source(src2)
+            if fixed_w is not None:
+                w = np.full(size, fixed_w, dtype=np.int64)
+                l = np.full(size, fixed_l, dtype=np.int64)
+            else:
+                both = (a >= 0) & (b >= 0)
+                p_a = 1.0 / (1.0 + 10.0 ** ((rating[b] - rating[a]) / ratings.SCALE))
+                a_wins = rng.random(size) < p_a
+                # With a BYE/empty side the real player (the larger index) goes through
+                w = np.where(both, np.where(a_wins, a, b), np.maximum(a, b))
+                l = np.where(both, np.where(a_wins, b, a), -1)
+            winners.append(w)
+            losers.append(l)
+
+            for entrants in (a, b):
+                reach[round_idx] += np.bincount(entrants[entrants >= 0], minlength=n_players)
+
+        champion = winners[-1]
+        titles += np.bincount(champion[champion >= 0], minlength=n_players)
+
+    return reach, titles
+
+def simulate(bracket, strengths=None, n_sims=DEFAULT_SIMS, processes=0, seed=None):
+    """
+    Plays out the remaining matches n_sims times. Returns
+    {"n_sims", "rounds", "reach": {player: {round: p}}, "win": {player: p}}.
+    processes > 1 spreads the runs over a process pool.
+    """
+    plan = build_plan(bracket, strengths)
+    players = plan['players']
+    if not players:
+        return {"n_sims": 0, "rounds": plan['rounds'], "reach": {}, "win": {}}
+
+    seeds = np.random.SeedSequence(seed)
+    if processes and processes > 1:
+        shares = [n_sims // processes + (1 if i < n_sims % processes else 0) for i in range(processes)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            parts = list(pool.map(_simulate_counts, [plan] * processes, shares, seeds.spawn(processes)))
+        reach = sum(p[0] for p in parts)
+        titles = sum(p[1] for p in parts)
+    else:
+        reach, titles = _simulate_counts(plan, n_sims, seeds)
+
+    reach_p = reach / n_sims
+    return {
+        "n_sims": n_sims,
+        "rounds": plan['rounds'],
+        "reach": {name: dict(zip(plan['rounds'], reach_p[:, i].tolist())) for i, name in enumerate(players)},
+        "win": dict(zip(players, (titles / n_sims).tolist())),
+    }
+
+def simulate_cached(tournament_id, n_sims=DEFAULT_SIMS, processes=0):
+    """simulate() for a live tournament, computed once per state version and ratings"""
+    key = (tournament_id, db.get_state_version(tournament_id), db.get_data_version('history'), n_sims)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    with _cache_lock:
+        if key not in _cache:
+            bracket = db.load_bracket_state(tournament_id, readonly=True, version=key[1])
+            if not bracket:
+                return None
+            # Old versions are useless once the bracket has moved on
+            for stale in [k for k in _cache if k[0] == tournament_id]:
+                del _cache[stale]
+            _cache[key] = simulate(bracket, n_sims=n_sims, processes=processes)
+    return _cache[key]
@@ -1,7 +1,7 @@
+import re
 import streamlit as st
 
-def load_css():
-    st.markdown("""
+_STYLESHEET = """
         <style>
         /* --- GLOBAL THEME --- */
         .stApp { 
@@ -69,6 +69,15 @@ def load_css():
             color: white;
         }
 
+        /* HEAD-TO-HEAD BADGE (sits just above the card) */
+        .h2h {
+            position: absolute;
+            top: -15px;
+            right: 0;
+            font-size: 10px;
+            color: #888;
+        }
+
         /* DIVIDER */
         .divider {
             height: 1px;
@@ -106,7 +115,6 @@ def load_css():
 
         /* HEADERS */
         h1, h2, h3, h4 { color: #b0b3b8 !important; font-size: 1.2rem; text-align: center; }
-        </style>
         div[data-baseweb="popover"] {
             z-index: 2000 !important; 
         }
@@ -115,4 +123,12 @@ def load_css():
             color: white !important;
         }
         </style>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+"""
+
+# Comments and indentation stripped once at import; every rerun still has to
+# emit the <style> element (Streamlit drops elements a run doesn't re-send),
+# but it is now one prebuilt, smaller string.
+CSS = re.sub(r"\s+", " ", re.sub(r"/\*.*?\*/", "", _STYLESHEET, flags=re.S)).strip()
+
+def load_css():
+    st.markdown(CSS, unsafe_allow_html=True)
@@ -1,15 +1,26 @@
+import csv
+import io
 import streamlit as st
 import database as db
 import game_logic as gl
-import textwrap
+import bracket_html as bh
+import head_to_head
+import perf
+import scheduler
+
+LIVE_REFRESH_SECONDS = 5
+
+# Layout constants for the element-per-card manager view
+CARD_HEIGHT = 85
+BASE_GAP = 20
 
 # --- POPUP MODAL ---
 @st.dialog("✏️ Edit Player Name")
-def rename_modal():
+def rename_modal(tournament_id):
     st.write("Fix a typo or update a name instantly.")
     
     # We load the bracket just to check valid names
-    bracket = db.load_bracket_state()
+    bracket = db.load_bracket_state(tournament_id)
     if not bracket:
         st.error("No active tournament found.")
         return
@@ -22,9 +33,16 @@ def rename_modal():
         new_name = st.text_input("New Name:")
         
         if st.form_submit_button("Update Name"):
-            if old_name and new_name:
-                updated_bracket = db.rename_player_in_active_tournament(old_name, new_name, bracket)
-                db.save_bracket_state(updated_bracket)
+            new_name = new_name.strip()
+            if old_name and new_name and new_name != old_name:
+                try:
+                    # Renames the saved brackets, players and history in one go
+                    db.rename_player(old_name, new_name)
+                except ValueError as e:
+                    st.error(str(e))
+                    return
+                import ratings
+                ratings.update_ratings() # no-op unless two rated players were merged
                 st.success(f"Renamed {old_name} to {new_name}")
                 st.rerun()
             else:
@@ -47,25 +65,64 @@ def _extract_names_from_bracket(bracket):
 
 
 # --- MAIN RENDERER ---
-def render_bracket(is_manager=False):
+def render_bracket(tournament_id, is_manager=False):
     st.markdown("## 🏆 Tournament Bracket")
+
+    if tournament_id is None:
+        st.info("Waiting for tournament to start...")
+        return
     
     # MANAGER TOOLBAR
     if is_manager:
-        c1, c2, c3 = st.columns([1, 1, 6])
+        c1, c2, c3, c4, c5 = st.columns([1, 1, 1, 1, 4])
         if c1.button("🔄 Refresh"):
             st.rerun()
         if c2.button("✏️ Edit Names"):
-            rename_modal() # Opens the popup
+            rename_modal(tournament_id) # Opens the popup
+        if c3.button("↩️ Undo", help="Revert the last action"):
+            _undo(tournament_id, count=1)
+        if c4.button("↪️ Redo", help="Re-apply the last undone action"):
+            db.retry_on_conflict(tournament_id, lambda b, version: db.redo_actions(tournament_id, b, expected_version=version))
+            _refresh_calls(tournament_id)
+            st.rerun()
+        _render_action_history(tournament_id)
+        _render_batch_entry(tournament_id)
     else:
-        if st.button("🔄 Refresh Bracket"):
+        c1, c2, c3 = st.columns([1, 1, 5])
+        if c1.button("🔄 Refresh Bracket"):
             st.rerun()
+        live = c2.toggle("📺 Live mode", key="live_mode", help="Keeps this screen up to date on its own (venue TVs).")
+        odds = c3.toggle("🎲 Title odds", key="show_odds", help="Monte Carlo play-out of the remaining matches.")
+        if live:
+            _render_live_bracket(tournament_id)
+        else:
+            _render_spectator_bracket(tournament_id, db.get_state_version(tournament_id))
+        if odds:
+            _render_odds(tournament_id)
+        return
     
-    bracket_data = db.load_bracket_state()
+    bracket_data = db.load_bracket_state(tournament_id)
     if not bracket_data:
         st.info("Waiting for tournament to start...")
         return
 
+    _widen_page(bracket_data)
+
+    # --- RENDER SECTIONS ---
+    st.markdown("### 🔥 Winners Bracket")
+    _render_tree(tournament_id, bracket_data, bracket_data['winners'], "W")
+
+    if bracket_data.get('losers'):
+        st.markdown("---")
+        st.markdown("### 🛡️ Losers Bracket")
+        _render_tree(tournament_id, bracket_data, bracket_data['losers'], "L")
+
+    if bracket_data.get('finals'):
+        st.markdown("---")
+        st.markdown("### 👑 Grand Finals")
+        _render_tree(tournament_id, bracket_data, bracket_data['finals'], "F")
+
+def _widen_page(bracket_data):
     # --- HORIZONTAL SCROLL HACK ---
     num_w_rounds = len(bracket_data['winners'])
     num_l_rounds = len(bracket_data.get('losers', []))
@@ -84,28 +141,56 @@ def render_bracket(is_manager=False):
         </style>
     """, unsafe_allow_html=True)
 
-    # --- RENDER SECTIONS ---
-    st.markdown("### 🔥 Winners Bracket")
-    _render_tree(bracket_data, bracket_data['winners'], is_manager, "W")
+# --- LIVE SPECTATOR VIEW ---
+@st.cache_data(ttl=1, show_spinner=False)
+def _poll_version(tournament_id):
+    """State version shared by every screen for a second, so N TVs cost ~1 query/sec"""
+    return db.get_state_version(tournament_id)
 
-    if bracket_data.get('losers'):
-        st.markdown("---")
-        st.markdown("### 🛡️ Losers Bracket")
-        _render_tree(bracket_data, bracket_data['losers'], is_manager, "L")
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def _render_live_bracket(tournament_id):
+    """Reruns on its own; an unchanged version re-emits the cached document"""
+    _render_spectator_bracket(tournament_id, _poll_version(tournament_id))
 
-    if bracket_data.get('finals'):
-        st.markdown("---")
-        st.markdown("### 👑 Grand Finals")
-        _render_tree(bracket_data, bracket_data['finals'], is_manager, "F")
+def _render_spectator_bracket(tournament_id, version):
+    # Spectators only read, so they share the cached snapshot
+    bracket_data = db.load_bracket_state(tournament_id, readonly=True, version=version)
+    if not bracket_data:
+        st.info("Waiting for tournament to start...")
+        return
 
-def _render_tree(full_bracket_data, rounds, is_manager, prefix):
-    # CSS Constants
-    CARD_HEIGHT = 85 
-    BASE_GAP = 20
-    
+    _widen_page(bracket_data)
+    # The whole board is one element, memoized per state version (and H2H archive)
+    history_version = db.get_data_version('history')
+    cache_key = (tournament_id, version, history_version)
+    h2h = None if bh.is_cached(cache_key) else head_to_head.bracket_records(bracket_data)
+    with perf.span("view.bracket_html"):
+        doc = bh.render_bracket_html(bracket_data, cache_key=cache_key, h2h=h2h)
+    st.markdown(doc, unsafe_allow_html=True)
+    perf.count("elements")
+    perf.count("html_bytes", len(doc))
+
+def _render_odds(tournament_id):
+    """Title / finals odds from the simulator (cached per state version)"""
+    import simulator
+    result = simulator.simulate_cached(tournament_id)
+    if not result or not result['win']:
+        return
+    rows = [
+        {"Player": name, "Win %": round(100 * p, 1), "Finals %": round(100 * result['reach'][name]['F1'], 1)}
+        for name, p in sorted(result['win'].items(), key=lambda item: -item[1])
+        if p > 0 or result['reach'][name]['F1'] > 0
+    ]
+    st.markdown("### 🎲 Title Odds")
+    st.caption(f"{result['n_sims']:,} simulated finishes, strengths from Elo ratings.")
+    st.dataframe(rows, hide_index=True)
+
+@perf.timed("view.render_tree")
+def _render_tree(tournament_id, full_bracket_data, rounds, prefix):
     cols = st.columns(len(rounds))
     
-    for r_idx, round_matches in enumerate(rounds):
+    for r_idx in range(len(rounds)):
+        round_matches = gl.round_matches(full_bracket_data, prefix, r_idx + 1)
         with cols[r_idx]:
             st.caption(f"Round {r_idx + 1}")
             
@@ -117,16 +202,16 @@ def _render_tree(full_bracket_data, rounds, is_manager, prefix):
                 st.write(f"<div style='height: {h}px'></div>", unsafe_allow_html=True)
 
             for m_idx, match in enumerate(round_matches):
-                if is_manager:
-                    _render_interactive_match(full_bracket_data, match)
-                else:
-                    _render_static_match(match)
-                
+                _render_interactive_match(tournament_id, full_bracket_data, match)
+
                 if m_idx < len(round_matches) - 1:
                     h = between_pad_units * (CARD_HEIGHT/2 + BASE_GAP/2) + BASE_GAP
                     st.write(f"<div style='height: {h}px'></div>", unsafe_allow_html=True)
 
-def _render_interactive_match(bracket_data, match):
+            # caption + spacers; the match renderers count their own
+            perf.count("elements", 1 + (top_pad_units > 0) + max(len(round_matches) - 1, 0))
+
+def _render_interactive_match(tournament_id, bracket_data, match):
     """MANAGER VIEW"""
     with st.container():
         # Dynamic Border Color: Orange if active, Green if done
@@ -138,11 +223,9 @@ def _render_interactive_match(bracket_data, match):
         if match['winner']:
             st.markdown(f"<div style='text-align:center; color: #4CAF50; font-weight:bold; font-size: 14px; margin-bottom: 5px;'>🎉 {match['winner']} Won</div>", unsafe_allow_html=True)
             
-            # Undo Button
-            if st.button("↩️ Undo Result", key=f"undo_{match['id']}", use_container_width=True):
-                gl.undo_match(bracket_data, match['id'])
-                db.save_bracket_state(bracket_data)
-                st.rerun()
+            # Undo Button (automatic BYE results only go back with the upstream result)
+            if not gl.is_automatic(match) and st.button("↩️ Undo Result", key=f"undo_{match['id']}", use_container_width=True):
+                _save_action(tournament_id, "undo", f"Undid {match['id']}", lambda b: _undo_result(b, match['id']))
 
         # --- IF MATCH IS OPEN: SHOW WIN BUTTONS ---
         else:
@@ -151,47 +234,135 @@ def _render_interactive_match(bracket_data, match):
             p1_disabled = (match['p1'] is None)
             
             if st.button(f"{p1}", key=f"btn_{match['id']}_p1", use_container_width=True, disabled=p1_disabled):
-                _handle_win(bracket_data, match, match['p1'], match['p2'])
+                _handle_win(tournament_id, match, match['p1'])
 
             p2 = match.get('p2') or "Waiting..."
             p2_disabled = (match['p2'] is None)
             
             if st.button(f"{p2}", key=f"btn_{match['id']}_p2", use_container_width=True, disabled=p2_disabled):
-                _handle_win(bracket_data, match, match['p2'], match['p1'])
+                _handle_win(tournament_id, match, match['p2'])
         
         st.markdown("</div>", unsafe_allow_html=True)
+        perf.count("elements", 4)
 
-def _render_static_match(match):
-    """SPECTATOR VIEW"""
-    p1 = match.get('p1') or "Waiting..."
-    p2 = match.get('p2') or "Waiting..."
-    
-    p1_cls = "winner-text" if match['winner'] == p1 and match['winner'] else ""
-    p2_cls = "winner-text" if match['winner'] == p2 and match['winner'] else ""
-    p1_mark = "✓" if match['winner'] == p1 and match['winner'] else ""
-    p2_mark = "✓" if match['winner'] == p2 and match['winner'] else ""
-    p1_box = "winner-box" if match['winner'] == p1 and match['winner'] else ""
-    p2_box = "winner-box" if match['winner'] == p2 and match['winner'] else ""
-
-    html = textwrap.dedent(f"""
-        <div class="match-card">
-            <div class="player-row">
-                <span class="player-name {p1_cls}">{p1}</span>
-                <span class="score-box {p1_box}">{p1_mark}</span>
-            </div>
-            <div class="divider"></div>
-            <div class="player-row">
-                <span class="player-name {p2_cls}">{p2}</span>
-                <span class="score-box {p2_box}">{p2_mark}</span>
-            </div>
-            <div class="connector-r"></div>
-        </div>
-    """)
-    st.markdown(html, unsafe_allow_html=True)
-
-def _handle_win(bracket_data, match, winner, loser):
-    match['winner'] = winner
-    match['loser'] = loser
-    gl.advance_bracket(bracket_data)
-    db.save_bracket_state(bracket_data)
-    st.rerun()
\ No newline at end of file
+def _handle_win(tournament_id, match, winner):
+    _save_action(tournament_id, "result", f"{winner} won {match['id']}",
+                 lambda b: gl.record_results(b, [(match['id'], winner)]))
+
+def _undo_result(bracket_data, match_id):
+    m = gl.get_graph(bracket_data).get(match_id)
+    if not (m and m['winner']):
+        return [f"{match_id}: already undone"]
+    if gl.is_automatic(m):
+        return [f"{match_id}: decided automatically by a BYE"]
+    gl.undo_match(bracket_data, match_id)
+    return []
+
+def _save_action(tournament_id, kind, label, change):
+    """
+    Applies the click to the latest saved state, not the one this rerun drew,
+    so a result another manager just saved is kept (see db.apply_action)
+    """
+    errors = db.apply_action(tournament_id, kind, label, change)
+    if errors:
+        for error in errors: st.error(error)
+        return
+    _refresh_calls(tournament_id)
+    st.rerun()
+
+def _refresh_calls(tournament_id):
+    """Closes and assigns table calls as results change, so the call board's match times are real"""
+    bracket_data = db.load_bracket_state(tournament_id, readonly=True)
+    if bracket_data:
+        scheduler.refresh_calls(tournament_id, bracket_data)
+
+# --- UNDO HISTORY ---
+def _undo(tournament_id, count=1, to_seq=None):
+    db.retry_on_conflict(tournament_id, lambda b, version: db.undo_actions(
+        tournament_id, b, count=count, to_seq=to_seq, expected_version=version))
+    _refresh_calls(tournament_id)
+    st.rerun()
+
+def _render_action_history(tournament_id):
+    """Recent actions; undo several at once or jump back to just after one of them"""
+    actions = db.list_actions(tournament_id)
+    if not actions:
+        return
+    with st.expander("🕘 History"):
+        c1, c2 = st.columns([1, 3])
+        steps = c1.number_input("Steps", min_value=1, value=1, key="undo_steps", label_visibility="collapsed")
+        if c2.button(f"↩️ Undo last {steps}"):
+            _undo(tournament_id, count=steps)
+
+        head = next((a[0] for a in actions if not a[4]), None)
+        for seq, kind, label, created_at, undone in actions:
+            c1, c2 = st.columns([5, 1])
+            text = f"#{seq} · {created_at} · {label or kind}"
+            c1.markdown(f"~~{text}~~" if undone else text)
+            if not undone and seq != head and c2.button("Back to here", key=f"revert_{seq}"):
+                _undo(tournament_id, to_seq=seq)
+
+# --- BATCH RESULTS ---
+def _render_batch_entry(tournament_id):
+    """Several results at once: pick winners in a form, or paste/upload match_id,winner lines"""
+    with st.expander("📝 Batch results"):
+        # Only read here (results go through apply_action), so the shared snapshot and its graph will do
+        bracket_data = db.load_bracket_state(tournament_id, readonly=True)
+        if not bracket_data:
+            return
+        section_order = {"W": 0, "L": 1, "F": 2}
+        playable = sorted(
+            (m for m in gl.get_graph(bracket_data).matches.values()
+             if m['p1'] and m['p2'] and not m['winner'] and "BYE" not in (m['p1'], m['p2'])),
+            key=lambda m: (section_order[m['id'][0]],) + gl.parse_match_id(m['id'])[1:]
+        )
+
+        pick_tab, paste_tab = st.tabs(["Playable matches", "Paste / CSV"])
+        with pick_tab, st.form("batch_pick_form"):
+            if not playable:
+                st.caption("No match is waiting for a result.")
+            picks = {}
+            for m in playable:
+                picks[m['id']] = st.radio(m['id'], ["—", m['p1'], m['p2']], horizontal=True, key=f"batch_{m['id']}")
+            if st.form_submit_button("Record selected"):
+                _apply_batch(tournament_id, [(match_id, winner) for match_id, winner in picks.items() if winner != "—"])
+
+        with paste_tab, st.form("batch_paste_form", clear_on_submit=True):
+            text = st.text_area("One result per line:", placeholder="W1-1,Alice\nW1-2,Bob")
+            upload = st.file_uploader("...or a CSV file", type=["csv", "txt"])
+            if st.form_submit_button("Record pasted"):
+                if upload is not None:
+                    text = (text + "\n" + upload.getvalue().decode("utf-8-sig"))
+                results, errors = _parse_results(text, bracket_data)
+                if errors:
+                    for error in errors: st.error(error)
+                else:
+                    _apply_batch(tournament_id, results)
+
+def _parse_results(text, bracket_data):
+    """match_id,winner lines -> ([(match_id, winner)], errors). Winner names ignore case."""
+    graph = gl.get_graph(bracket_data)
+    results, errors = [], []
+    for line_no, row in enumerate(csv.reader(io.StringIO(text)), start=1):
+        cells = [c.strip() for c in row]
+        if not any(cells) or cells[0].lower() in ("match_id", "match"):
+            continue
+        if len(cells) < 2 or not cells[1]:
+            errors.append(f"Line {line_no}: expected match_id,winner")
+            continue
+        match_id, winner = cells[0].upper(), cells[1]
+        m = graph.get(match_id)
+        if m:
+            # Use the bracket's spelling when only the case differs
+            winner = next((p for p in (m['p1'], m['p2']) if p and p.lower() == winner.lower()), winner)
+        results.append((match_id, winner))
+    return results, errors
+
+def _apply_batch(tournament_id, results):
+    """All or nothing: one journal, one save (one transaction), one rerun"""
+    if not results:
+        st.warning("Nothing to record.")
+        return
+    # Any error discards the whole batch (it ran on a private copy)
+    _save_action(tournament_id, "batch", f"{len(results)} result{'s' if len(results) != 1 else ''}",
+                 lambda b: gl.record_results(b, results))
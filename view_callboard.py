@@ -0,0 +1,59 @@
+import html
+import time
+import streamlit as st
+import database as db
+import scheduler
+
+BOARD_REFRESH_SECONDS = 5
+
+def render_call_board(tournament_id, is_manager=False):
+    st.markdown("## 📋 Call Board")
+    if tournament_id is None:
+        st.info("Waiting for tournament to start...")
+        return
+
+    if is_manager:
+        c1, c2 = st.columns([1, 5])
+        tables = c1.number_input("Tables", min_value=1, max_value=64,
+                                 value=scheduler.get_table_count(tournament_id), key=f"tables_{tournament_id}")
+        if tables != scheduler.get_table_count(tournament_id):
+            scheduler.set_table_count(tournament_id, tables)
+        finished, mean_minutes, elapsed = scheduler.call_stats(tournament_id)
+        c2.caption(f"{finished} matches played · {mean_minutes:.1f} min per match · {elapsed:.0f} min since the first call")
+
+    _render_board(tournament_id, is_manager)
+
+@st.fragment(run_every=BOARD_REFRESH_SECONDS)
+def _render_board(tournament_id, is_manager):
+    """
+    Result writes close and assign calls. The manager's board also
+    re-evaluates them on every tick, so players whose rest is over get
+    called; spectator screens only read.
+    """
+    bracket = db.load_bracket_state(tournament_id, readonly=True)
+    if not bracket:
+        st.info("Waiting for tournament to start...")
+        return
+
+    calls = scheduler.refresh_calls(tournament_id, bracket) if is_manager else scheduler.get_calls(tournament_id)
+    if not calls:
+        st.success("No matches waiting for a table.")
+
+    now = time.time()
+    cards = []
+    for table_no, match_id, p1, p2, called_at in calls:
+        minutes = int((now - called_at) // 60)
+        cards.append(
+            f'<div class="match-card" style="padding: 10px; margin-bottom: 10px;">'
+            f'<div style="color: #f47920; font-weight: bold;">TABLE {table_no}</div>'
+            f'<div style="font-size: 20px;">{html.escape(p1)} <span style="color: #888;">vs</span> {html.escape(p2)}</div>'
+            f'<div style="color: #888; font-size: 12px;">{match_id} · called {minutes} min ago</div>'
+            f'</div>'
+        )
+    st.markdown("".join(cards), unsafe_allow_html=True)
+
+    if is_manager:
+        on_table = {call[1] for call in calls}
+        queue = [match_id for match_id in scheduler.ready_queue(bracket) if match_id not in on_table]
+        if queue:
+            st.caption("Next up: " + " · ".join(queue[:10]))
@@ -0,0 +1,19 @@
+import streamlit as st
+import database as db
+
+def render_leaderboard():
+    st.markdown("## 📊 Leaderboard")
+
+    rows = db.get_leaderboard(limit=100)
+    if not rows:
+        st.info("No archived tournaments yet.")
+        return
+
+    table = [
+        {"Player": name, "Titles": titles, "Wins": wins, "Losses": losses,
+         "Win %": round(100 * wins / (wins + losses)) if wins + losses else 0,
+         "Tournaments": played,
+         "Rating": round(rating) if rating is not None else None}
+        for name, titles, wins, losses, played, rating in rows
+    ]
+    st.dataframe(table, use_container_width=True, hide_index=True)
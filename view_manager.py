@@ -1,18 +1,20 @@
+import csv
+import io
 import streamlit as st
 import database as db
 import game_logic as gl
+import perf
 
-def render_setup_tab():
+def render_setup_tab(tournament_id):
     st.markdown("### 🛠️ Tournament Admin")
     
     # --- ARCHIVE TOOL ---
     with st.expander("Conclude Tournament", expanded=True):
-        st.warning("This will save results to history and clear the current bracket.")
+        st.warning("This will save the selected tournament's results to history and close its bracket.")
         if st.button("💾 Archive & Reset"):
-            bracket = db.load_bracket_state()
-            if bracket:
-                db.archive_tournament(bracket)
-                db.save_bracket_state(None) # Clear active state
+            if tournament_id is not None and db.archive_tournament(tournament_id):
+                import ratings
+                ratings.update_ratings() # Only the games just archived
                 st.success("Tournament saved to history!")
                 st.rerun()
             else:
@@ -28,16 +30,153 @@ def render_setup_tab():
             db.add_player_to_db(new_player)
             st.success(f"Added {new_player}")
             st.rerun()
+    with st.expander("📋 Import roster"):
+        _render_roster_import()
 
     st.subheader("Start New Tournament")
-    available_players = db.get_all_players()
-    selected = st.multiselect("Select Players:", available_players)
-    
+    tournament_name = st.text_input("Tournament Name:", placeholder="e.g. Open Division")
+    _render_player_picker()
+    selected = st.session_state.get(FIELD_KEY, [])
+
     if st.button("🚨 Generate Bracket", type="primary"):
         if len(selected) < 2:
             st.error("Need 2+ players")
         else:
             bracket = gl.generate_bracket(selected)
             db.update_participation(selected)
-            db.save_bracket_state(bracket)
-            st.success("Bracket Created! Go to 'Live Bracket' tab.")
\ No newline at end of file
+            # Runs alongside any other active tournaments; main.py selects it on the next rerun
+            st.session_state.pending_tournament_id = db.create_tournament(tournament_name.strip() or None, bracket)
+            st.success("Bracket Created! Go to 'Live Bracket' tab.")
+
+# --- ROSTER IMPORT ---
+ROSTER_HEADERS = ("name", "player", "player name", "full name")
+
+def _parse_roster(text):
+    """Names from pasted lines or a sign-up sheet CSV (its name column if it has a header, else the first)"""
+    rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+    column = 0
+    if rows:
+        header = [cell.strip().lower() for cell in rows[0]]
+        column = next((header.index(h) for h in ROSTER_HEADERS if h in header), None)
+        if column is None:
+            column = 0
+        else:
+            rows = rows[1:]
+    return [row[column] for row in rows if len(row) > column]
+
+def _render_roster_import():
+    """Many players in one transaction and one rerun; the report survives the rerun"""
+    report = st.session_state.pop("import_report", None)
+    if report:
+        added, existing = report
+        st.success(f"Added {len(added)} new player{'s' if len(added) != 1 else ''}.")
+        if existing:
+            st.info(f"Already on the roster ({len(existing)}): " + ", ".join(existing))
+
+    with st.form("import_roster_form", clear_on_submit=True):
+        text = st.text_area("One name per line:", placeholder="Alice\nBob")
+        upload = st.file_uploader("...or a sign-up sheet (CSV)", type=["csv", "txt"])
+        to_field = st.checkbox("Also add them to the new tournament's field")
+        if st.form_submit_button("Import"):
+            if upload is not None:
+                text = text + "\n" + upload.getvalue().decode("utf-8-sig")
+            names = _parse_roster(text)
+            if not names:
+                st.warning("No names found.")
+                return
+            added, existing = db.add_players(names)
+            if to_field:
+                _add_to_field(*added, *existing)
+            st.session_state.import_report = (added, existing)
+            st.rerun()
+
+# --- PLAYER PICKER ---
+# The field is built from paged prefix searches and quick picks instead of
+# one multiselect over the whole roster. Results are cached per roster
+# version, so reruns while typing or paging only hit the database once.
+FIELD_KEY = "setup_field"
+PICKER_COLUMNS = 4
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _search_page(prefix, page, roster_version):
+    names, more = db.search_players(prefix, offset=page * db.PLAYER_PAGE_SIZE)
+    return names, more, db.count_players(prefix)
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _quick_picks(roster_version):
+    return db.get_quick_picks()
+
+def _add_to_field(*names):
+    field = st.session_state.get(FIELD_KEY, [])
+    st.session_state[FIELD_KEY] = field + [n for n in dict.fromkeys(names) if n not in field]
+
+def _render_player_picker():
+    roster_version = db.get_data_version('roster')
+    st.session_state.setdefault(FIELD_KEY, [])
+    field = st.session_state[FIELD_KEY]
+    st.multiselect(f"Field ({len(field)} players):", field, key=FIELD_KEY,
+                   help="Remove a player with the ×; add players below.")
+
+    frequent, recent = _quick_picks(roster_version)
+    c1, c2 = st.columns(2)
+    c1.button("⭐ Add regulars", on_click=_add_to_field, args=frequent, disabled=not frequent,
+              help=", ".join(frequent))
+    c2.button("🕘 Add last played", on_click=_add_to_field, args=recent, disabled=not recent,
+              help=", ".join(recent))
+
+    prefix = st.text_input("Search players:", placeholder="First letters of a name").strip()
+    page_key = f"setup_page_{prefix.lower()}"
+    page = st.session_state.get(page_key, 0)
+    names, more, total = _search_page(prefix, page, roster_version)
+    if not names:
+        st.caption("No player matches. Add them above.")
+        return
+
+    cols = st.columns(PICKER_COLUMNS)
+    for i, name in enumerate(names):
+        cols[i % PICKER_COLUMNS].button(name, key=f"pick_{name}", on_click=_add_to_field, args=(name,),
+                                        disabled=name in field, use_container_width=True)
+
+    c1, c2, c3 = st.columns([1, 4, 1])
+    if c1.button("◀ Prev", disabled=page == 0):
+        st.session_state[page_key] = page - 1
+        st.rerun()
+    c2.caption(f"{page * db.PLAYER_PAGE_SIZE + 1}–{page * db.PLAYER_PAGE_SIZE + len(names)} of {total}")
+    if c3.button("Next ▶", disabled=not more):
+        st.session_state[page_key] = page + 1
+        st.rerun()
+
+# --- PERFORMANCE PANEL ---
+def render_perf_panel():
+    """Sidebar timings for recent reruns. Collection is process-wide and off by default."""
+    st.sidebar.toggle("⏱️ Performance panel", value=perf.ENABLED, key="perf_panel",
+                      on_change=lambda: perf.set_enabled(st.session_state.perf_panel))
+    if not st.session_state.perf_panel:
+        return
+
+    runs = perf.history()
+    if not runs:
+        st.sidebar.caption("Collecting... interact with the app to record reruns.")
+        return
+
+    last = runs[-1]
+    with st.sidebar.expander(f"Last rerun: {last['total'] * 1000:.1f} ms", expanded=True):
+        st.dataframe(
+            [{"Step": name, "ms": round(seconds * 1000, 2), "Calls": calls}
+             for name, (seconds, calls) in sorted(last['timings'].items(), key=lambda item: -item[1][0])],
+            hide_index=True
+        )
+        st.caption(" · ".join(f"{name}: {value:,}" for name, value in last['counters'].items()))
+
+    with st.sidebar.expander(f"Average over {len(runs)} reruns"):
+        st.dataframe(
+            [{"Step": name, "ms / rerun": round(mean_ms, 2), "Calls": calls}
+             for name, (calls, _, mean_ms) in sorted(perf.summary(runs).items(), key=lambda item: -item[1][2])],
+            hide_index=True
+        )
+
+    c1, c2 = st.sidebar.columns(2)
+    c1.download_button("JSON", perf.export_json(runs), file_name="perf.json", mime="application/json")
+    c2.download_button("CSV", perf.export_csv(runs), file_name="perf.csv", mime="text/csv")
+    if st.sidebar.button("Clear timings"):
+        perf.clear()